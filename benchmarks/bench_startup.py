@@ -0,0 +1,81 @@
+"""Startup burst and time-to-ready of sender tasks after a restart.
+
+Simulates a restart of pairs with random intervals and last send times and compares
+the old behaviour (every pair ticks immediately) with `plan_start_delays`:
+peak first ticks per second (the burst), how long until every overdue pair is online
+(time-to-ready) and how late a pair starts compared to its own interval.
+
+    PYTHONPATH=src python benchmarks/bench_startup.py [pairs] [rate] [jitter]
+"""
+
+import random
+import sys
+import time
+from collections import Counter
+from datetime import UTC, datetime, timedelta
+
+from database.database_connector import GroupPair
+from resender_bot.sender_task import plan_start_delays
+
+
+def simulated_pairs(n: int, now: datetime):
+    pairs = []
+    last_sent = {}
+    for i in range(n):
+        interval = random.randint(60, 3600)
+        pairs.append(GroupPair(private_chat_id=i, public_chat_id=-i, interval=interval))
+        if random.random() < 0.9:
+            last_sent[i] = now - timedelta(seconds=random.uniform(0, 2 * interval))
+    return pairs, last_sent
+
+
+def due_in(pairs: list[GroupPair], last_sent: dict[int, datetime], now: datetime):
+    """Seconds until each pair is due by its interval alone"""
+    due = {}
+    for pair in pairs:
+        if pair.private_chat_id not in last_sent:
+            due[pair.private_chat_id] = 0.0
+            continue
+        resume_at = last_sent[pair.private_chat_id] + timedelta(seconds=pair.interval)
+        due[pair.private_chat_id] = max(0.0, (resume_at - now).total_seconds())
+    return due
+
+
+def report(name: str, delays: dict[int, float], due: dict[int, float]):
+    per_second = Counter(int(delay) for delay in delays.values())
+    overdue = [delay for pair_id, delay in delays.items() if due[pair_id] == 0]
+    late = [max(0.0, delay - due[pair_id]) for pair_id, delay in delays.items()]
+    print(
+        f"{name:<10}"
+        f"{max(per_second.values()):>14}"
+        f"{len(overdue):>10}"
+        f"{max(overdue):>26.1f}"
+        f"{max(late):>17.1f}"
+    )
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    rate = float(sys.argv[2]) if len(sys.argv) > 2 else 5
+    jitter = float(sys.argv[3]) if len(sys.argv) > 3 else 10
+
+    now = datetime.now(UTC)
+    pairs, last_sent = simulated_pairs(n, now)
+    due = due_in(pairs, last_sent, now)
+
+    start = time.perf_counter()
+    planned = plan_start_delays(pairs, last_sent, now, rate=rate, jitter=jitter)
+    planning_ms = (time.perf_counter() - start) * 1000
+
+    print(
+        f"{n} pairs, {rate} pairs/s, {jitter}s jitter, planned in {planning_ms:.1f}ms\n"
+    )
+    print(
+        f"{'':<10}{'peak ticks/s':>14}{'overdue':>10}{'time-to-ready (overdue)':>26}{'max lateness':>17}"
+    )
+    report('legacy', {pair.private_chat_id: 0.0 for pair in pairs}, due)
+    report('staggered', planned, due)
+
+
+if __name__ == '__main__':
+    main()
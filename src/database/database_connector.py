@@ -1,8 +1,27 @@
+import time
 from datetime import UTC, datetime
 from enum import StrEnum
 
-from sqlalchemy import BigInteger, DateTime, select, and_, func
-from sqlalchemy.dialects.postgresql import insert
+from pydantic import BaseModel
+from sqlalchemy import (
+    BigInteger,
+    DateTime,
+    Index,
+    String,
+    TypeDecorator,
+    and_,
+    bindparam,
+    delete,
+    event,
+    func,
+    inspect,
+    literal_column,
+    or_,
+    select,
+    update,
+)
+from sqlalchemy.dialects.postgresql import ARRAY, JSONB, insert
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
 from sqlalchemy.ext.asyncio import (
     AsyncEngine,
     AsyncSession,
@@ -10,7 +29,10 @@ from sqlalchemy.ext.asyncio import (
     create_async_engine,
 )
 from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column
+from sqlalchemy.pool import AsyncAdaptedQueuePool
 
+from database.migrations import apply_migrations
+from resender_bot.metrics import metrics
 from resender_bot.settings import Settings
 
 
@@ -19,17 +41,46 @@ class SendOrderEnum(StrEnum):
     OLDEST = "OLDEST"
 
 
+class SchemaOutdatedError(RuntimeError):
+    pass
+
+
 class MessageStatusEnum(StrEnum):
     NOT_SENT = "NOT_SENT"
     SENT = "SENT"
     ERROR = "ERROR"
 
 
+class MessageLink(BaseModel):
+    url: str
+    # metadata slots, filled once the link is probed / uploaded
+    mime: str | None = None
+    size: int | None = None
+    file_id: str | None = None
+
+
+class LinkList(TypeDecorator):
+    """Stores a list of `MessageLink` as a jsonb array of objects"""
+
+    impl = JSONB
+    cache_ok = True
+
+    def process_bind_param(self, value: list[MessageLink] | None, dialect):
+        if value is None:
+            return None
+        return [link.model_dump() for link in value]
+
+    def process_result_value(self, value: list[dict] | None, dialect):
+        if value is None:
+            return None
+        return [MessageLink.model_validate(link) for link in value]
+
+
 class Base(DeclarativeBase):
     __abstract__ = True
 
     created_at: Mapped[datetime] = mapped_column(
-        DateTime(timezone=True), default=datetime.now(UTC)
+        DateTime(timezone=True), default=lambda: datetime.now(UTC)
     )
 
 
@@ -42,24 +93,52 @@ class GroupPair(Base):
     )
     send_order: Mapped[SendOrderEnum] = mapped_column(default=SendOrderEnum.OLDEST)
     interval: Mapped[int] = mapped_column(default=180)
+    # more channels receiving copies of what is posted to public_chat_id
+    extra_chat_ids: Mapped[list[int]] = mapped_column(
+        ARRAY(BigInteger), default=list, server_default='{}'
+    )
 
     def __str__(self):
-        return f"GroupPair(public_chat_id={self.public_chat_id}, private_chat_id={self.private_chat_id}, send_order={self.send_order}, interval={self.interval})"
+        return f"GroupPair(public_chat_id={self.public_chat_id}, private_chat_id={self.private_chat_id}, send_order={self.send_order}, interval={self.interval}, extra_chat_ids={self.extra_chat_ids})"
 
 
 class ScheduledMessage(Base):
     __tablename__ = 'scheduled_messages'
 
     id: Mapped[int] = mapped_column(primary_key=True)
-    message_id: Mapped[int]
+    # id in the source group, None for bulk imported messages
+    message_id: Mapped[int | None]
     group_pair_id: Mapped[int] = mapped_column(BigInteger)
     status: Mapped[MessageStatusEnum] = mapped_column(default=MessageStatusEnum.NOT_SENT)
     text: Mapped[str | None]
-    links: Mapped[str | None]
+    links: Mapped[list[MessageLink] | None] = mapped_column(LinkList)
     file_id: Mapped[str | None]
     media_group_id: Mapped[str | None]
     media_type: Mapped[str | None]
     meta_info: Mapped[str]
+    # fingerprint of the content, see `resender_bot.fingerprint`
+    content_hash: Mapped[str | None] = mapped_column(String(64), index=True)
+    # set when the message leaves the queue (SENT or ERROR), used for retention
+    finished_at: Mapped[datetime | None] = mapped_column(DateTime(timezone=True))
+    # failed attempts, the message isn't picked again before next_attempt_at
+    attempts: Mapped[int] = mapped_column(default=0, server_default='0')
+    next_attempt_at: Mapped[datetime | None] = mapped_column(DateTime(timezone=True))
+    last_error: Mapped[str | None]
+
+    __table_args__ = (
+        # the live queue is a small fraction of the table, so is this index
+        Index(
+            'ix_scheduled_messages_queue',
+            'group_pair_id',
+            'created_at',
+            postgresql_where=literal_column('status') == 'NOT_SENT',
+        ),
+        Index(
+            'ix_scheduled_messages_finished_at',
+            'finished_at',
+            postgresql_where=literal_column('status') != 'NOT_SENT',
+        ),
+    )
 
     def __str__(self):
         return (
@@ -68,89 +147,404 @@ class ScheduledMessage(Base):
         )
 
 
-async def get_next_msg(
-    session: AsyncSession, group_pair: GroupPair
-) -> ScheduledMessage | None:
-    query = (
-        select(ScheduledMessage)
-        .where(
-            and_(
-                ScheduledMessage.group_pair_id == group_pair.private_chat_id,
-                ScheduledMessage.status == MessageStatusEnum.NOT_SENT,
-            )
+class PairStats(Base):
+    """Queue counters of a pair, maintained by triggers on `scheduled_messages`.
+
+    `sent` and `error` are lifetime counters, retention doesn't decrease them
+    """
+
+    __tablename__ = 'pair_stats'
+
+    group_pair_id: Mapped[int] = mapped_column(
+        BigInteger, primary_key=True, autoincrement=False
+    )
+    queued: Mapped[int] = mapped_column(default=0)
+    sent: Mapped[int] = mapped_column(default=0)
+    error: Mapped[int] = mapped_column(default=0)
+    last_sent_at: Mapped[datetime | None] = mapped_column(DateTime(timezone=True))
+
+
+@event.listens_for(ScheduledMessage.status, 'set')
+def _set_finished_at(target: ScheduledMessage, value, oldvalue, initiator):
+    if value != MessageStatusEnum.NOT_SENT:
+        target.finished_at = datetime.now(UTC)
+
+
+class ArchivedMessage(Base):
+    """Finished message moved out of `scheduled_messages` by retention"""
+
+    __tablename__ = 'scheduled_messages_archive'
+
+    id: Mapped[int] = mapped_column(primary_key=True, autoincrement=False)
+    group_pair_id: Mapped[int] = mapped_column(BigInteger)
+    status: Mapped[MessageStatusEnum]
+    finished_at: Mapped[datetime | None] = mapped_column(DateTime(timezone=True))
+    # the whole original row, so the archive doesn't follow every schema change
+    data: Mapped[dict] = mapped_column(JSONB)
+
+
+# Hot statements are built once with bind parameters: per call only parameters are
+# passed, so there is no construct building, the compiled form is taken from the
+# SQLAlchemy cache and the SQL string hits the asyncpg prepared statements cache.
+_NEXT_MSG_QUERY = (
+    select(ScheduledMessage)
+    .where(
+        and_(
+            ScheduledMessage.group_pair_id == bindparam('group_pair_id'),
+            ScheduledMessage.status == MessageStatusEnum.NOT_SENT,
+            or_(
+                ScheduledMessage.next_attempt_at.is_(None),
+                ScheduledMessage.next_attempt_at <= func.now(),
+            ),
         )
-        .limit(1)
     )
-    if group_pair.send_order == SendOrderEnum.OLDEST:
-        query = query.order_by(ScheduledMessage.created_at)
-    elif group_pair.send_order == SendOrderEnum.RANDOM:
-        query = query.order_by(func.random())
-    result = await session.execute(query)
+    .limit(1)
+)
+NEXT_MSG_QUERIES = {
+    SendOrderEnum.OLDEST: _NEXT_MSG_QUERY.order_by(ScheduledMessage.created_at),
+    SendOrderEnum.RANDOM: _NEXT_MSG_QUERY.order_by(func.random()),
+}
+
+NEXT_ATTEMPT_QUERY = select(func.min(ScheduledMessage.next_attempt_at)).where(
+    and_(
+        ScheduledMessage.group_pair_id == bindparam('group_pair_id'),
+        ScheduledMessage.status == MessageStatusEnum.NOT_SENT,
+    )
+)
+
+# pair_stats keeps the last send of each pair, no scan of the queue at startup
+LAST_SENT_TIMES_QUERY = select(PairStats.group_pair_id, PairStats.last_sent_at).where(
+    PairStats.last_sent_at.is_not(None)
+)
+
+MATCHING_MEDIA_QUERY = select(ScheduledMessage).where(
+    ScheduledMessage.media_group_id == bindparam('media_group_id')
+)
+
+SCHEDULED_MESSAGE_QUERY = (
+    select(ScheduledMessage)
+    .where(
+        and_(
+            ScheduledMessage.message_id == bindparam('message_id'),
+            ScheduledMessage.group_pair_id == bindparam('group_id'),
+        )
+    )
+    .limit(1)
+)
+
+# queued for the channel, or sent to it after `sent_after`
+_FOR_CHANNEL_RECENTLY = and_(
+    GroupPair.public_chat_id == bindparam('public_chat_id'),
+    or_(
+        ScheduledMessage.status == MessageStatusEnum.NOT_SENT,
+        and_(
+            ScheduledMessage.status == MessageStatusEnum.SENT,
+            ScheduledMessage.finished_at >= bindparam('sent_after'),
+        ),
+    ),
+)
+
+DUPLICATE_QUERY = (
+    select(ScheduledMessage.id)
+    .join(GroupPair, GroupPair.private_chat_id == ScheduledMessage.group_pair_id)
+    .where(
+        and_(
+            ScheduledMessage.content_hash == bindparam('content_hash'),
+            _FOR_CHANNEL_RECENTLY,
+        )
+    )
+    .limit(1)
+)
+
+RECENT_HASHES_QUERY = (
+    select(ScheduledMessage.content_hash)
+    .distinct()
+    .join(GroupPair, GroupPair.private_chat_id == ScheduledMessage.group_pair_id)
+    .where(and_(ScheduledMessage.content_hash.is_not(None), _FOR_CHANNEL_RECENTLY))
+)
+
+# Core (not ORM) insert: ORM inserts with a parameters dict run in bulk mode,
+# which doesn't report rowcount
+_upsert_pair_insert = insert(GroupPair.__table__).values(
+    private_chat_id=bindparam('private_chat_id'),
+    public_chat_id=bindparam('public_chat_id'),
+)
+UPSERT_GROUP_PAIR_QUERY = _upsert_pair_insert.on_conflict_do_update(
+    index_elements=[GroupPair.__table__.c.private_chat_id],
+    set_={'public_chat_id': _upsert_pair_insert.excluded.public_chat_id},
+)
+
+
+async def get_next_msg(
+    session: AsyncSession, group_pair_id: int, send_order: SendOrderEnum
+) -> ScheduledMessage | None:
+    query = NEXT_MSG_QUERIES.get(send_order, _NEXT_MSG_QUERY)
+    result = await session.execute(query, {'group_pair_id': group_pair_id})
     return result.scalar_one_or_none()
 
 
+async def get_next_attempt_at(
+    session: AsyncSession, group_pair_id: int
+) -> datetime | None:
+    """When the earliest message of the pair backing off after a failure is due"""
+    return await session.scalar(NEXT_ATTEMPT_QUERY, {'group_pair_id': group_pair_id})
+
+
 async def get_all_pairs(db_session: AsyncSession) -> list[GroupPair]:
     query = select(GroupPair)
     result = await db_session.execute(query)
     return list(result.scalars())
 
 
+async def get_last_sent_times(db_session: AsyncSession) -> dict[int, datetime]:
+    """When each pair last sent a message"""
+    result = await db_session.execute(LAST_SENT_TIMES_QUERY)
+    return {group_pair_id: last_sent for group_pair_id, last_sent in result}
+
+
+async def get_all_pair_stats(db_session: AsyncSession) -> list[PairStats]:
+    result = await db_session.execute(select(PairStats))
+    return list(result.scalars())
+
+
 async def get_all_matching_media(
     db_session: AsyncSession, media_group_id: str
 ) -> list[ScheduledMessage]:
-    query = select(ScheduledMessage).where(
-        ScheduledMessage.media_group_id == media_group_id
+    result = await db_session.execute(
+        MATCHING_MEDIA_QUERY, {'media_group_id': media_group_id}
     )
-    result = await db_session.execute(query)
     return list(result.scalars())
 
 
 async def get_scheduled_message(
     db_session: AsyncSession, message_id: int, group_id: int
 ) -> ScheduledMessage:
+    result = await db_session.execute(
+        SCHEDULED_MESSAGE_QUERY, {'message_id': message_id, 'group_id': group_id}
+    )
+    return result.scalar_one_or_none()
+
+
+async def find_duplicate(
+    db_session: AsyncSession, content_hash: str, public_chat_id: int, sent_after: datetime
+) -> int | None:
+    """Returns id of a message with the same content for the same channel,
+    either still queued or sent after `sent_after`
+    """
+    result = await db_session.execute(
+        DUPLICATE_QUERY,
+        {
+            'content_hash': content_hash,
+            'public_chat_id': public_chat_id,
+            'sent_after': sent_after,
+        },
+    )
+    return result.scalar_one_or_none()
+
+
+async def get_recent_hashes(
+    db_session: AsyncSession, public_chat_id: int, sent_after: datetime
+) -> set[str]:
+    """Fingerprints `find_duplicate` would match for the channel, all at once"""
+    result = await db_session.execute(
+        RECENT_HASHES_QUERY,
+        {'public_chat_id': public_chat_id, 'sent_after': sent_after},
+    )
+    return set(result.scalars())
+
+
+async def update_scheduled_message(
+    db_session: AsyncSession,
+    group_id: int,
+    message_id: int,
+    text: str | None,
+    links: list[MessageLink] | None,
+    file_id: str | None,
+    media_type: str | None,
+    content_hash: str | None = None,
+) -> int | None:
+    """Updates content of a queued message in a single round trip.
+
+    Returns id of the updated row, or None if the message is unknown or was already sent
+    """
     query = (
-        select(ScheduledMessage)
+        update(ScheduledMessage)
         .where(
             and_(
-                ScheduledMessage.message_id == message_id,
                 ScheduledMessage.group_pair_id == group_id,
+                ScheduledMessage.message_id == message_id,
+                ScheduledMessage.status == MessageStatusEnum.NOT_SENT,
             )
         )
-        .limit(1)
+        .values(
+            text=text,
+            links=links,
+            file_id=file_id,
+            media_type=media_type,
+            content_hash=content_hash,
+        )
+        .returning(ScheduledMessage.id)
+        .execution_options(synchronize_session=False)
     )
     result = await db_session.execute(query)
     return result.scalar_one_or_none()
 
 
+# NOTIFY channel with private_chat_id of a pair whose settings were changed
+PAIRS_CHANNEL = 'group_pairs'
+
+
+async def notify_pair_changed(db_session: AsyncSession, private_chat_id: int):
+    """Tells other processes to drop their cached copy of the pair on commit"""
+    await db_session.execute(select(func.pg_notify(PAIRS_CHANNEL, str(private_chat_id))))
+
+
+# NOTIFY channel with group_pair_id of a pair that got a new message queued
+QUEUE_CHANNEL = 'scheduled_messages'
+
+
+async def notify_message_queued(db_session: AsyncSession, group_pair_id: int):
+    """Wakes the idle sender of the pair, in whatever process it runs, on commit"""
+    await db_session.execute(select(func.pg_notify(QUEUE_CHANNEL, str(group_pair_id))))
+
+
 async def upsert_new_group_pair(
     db_session: AsyncSession, private_chat_id: int, public_channel_id: int
 ):
-    query = (
-        insert(GroupPair)
-        .values(private_chat_id=private_chat_id, public_chat_id=public_channel_id)
-        .on_conflict_do_update(
-            index_elements=[GroupPair.private_chat_id],
-            set_={GroupPair.public_chat_id: public_channel_id},
+    result = await db_session.execute(
+        UPSERT_GROUP_PAIR_QUERY,
+        {'private_chat_id': private_chat_id, 'public_chat_id': public_channel_id},
+    )
+    return result.rowcount
+
+
+_scheduled_messages = ScheduledMessage.__table__
+
+_expired_ids = (
+    select(_scheduled_messages.c.id)
+    .where(
+        and_(
+            _scheduled_messages.c.status != MessageStatusEnum.NOT_SENT,
+            _scheduled_messages.c.finished_at < bindparam('cutoff'),
         )
     )
+    .limit(bindparam('batch_size'))
+    .with_for_update(skip_locked=True)
+)
 
-    result = await db_session.execute(query)
+DELETE_EXPIRED_QUERY = delete(_scheduled_messages).where(
+    _scheduled_messages.c.id.in_(_expired_ids.scalar_subquery())
+)
+
+_moved = (
+    delete(_scheduled_messages)
+    .where(_scheduled_messages.c.id.in_(_expired_ids.scalar_subquery()))
+    .returning(*_scheduled_messages.c)
+    .cte('moved')
+)
+ARCHIVE_EXPIRED_QUERY = insert(ArchivedMessage.__table__).from_select(
+    ['id', 'group_pair_id', 'status', 'created_at', 'finished_at', 'data'],
+    select(
+        _moved.c.id,
+        _moved.c.group_pair_id,
+        _moved.c.status,
+        _moved.c.created_at,
+        _moved.c.finished_at,
+        func.to_jsonb(literal_column('moved')),
+    ),
+)
+
+
+async def purge_finished_messages(
+    db_session: AsyncSession, cutoff: datetime, batch_size: int, archive: bool
+) -> int:
+    """Moves (or deletes) one batch of messages finished before `cutoff`.
+
+    Returns number of processed rows, locked rows are skipped
+    """
+    query = ARCHIVE_EXPIRED_QUERY if archive else DELETE_EXPIRED_QUERY
+    result = await db_session.execute(query, {'cutoff': cutoff, 'batch_size': batch_size})
     return result.rowcount
 
 
+class InstrumentedQueuePool(AsyncAdaptedQueuePool):
+    """Queue pool that reports how long a checkout takes until the `checkout` event.
+
+    Checkouts that had to open a connection are reported apart, their latency is
+    mostly connect time rather than waiting for a free connection
+    """
+
+    def connect(self):
+        started = time.perf_counter()
+        try:
+            connection = super().connect()
+        except PoolTimeoutError:
+            metrics.inc(f'db_pool_timeouts_{self.logging_name}')
+            raise
+        checked_out_at = connection.info.get('checked_out_at', started)
+        kind = 'connect' if connection.info.get('connected_at', 0) >= started else 'wait'
+        metrics.observe(f'db_pool_{kind}_{self.logging_name}', checked_out_at - started)
+        return connection
+
+
+def instrument_pool(engine: AsyncEngine, name: str, max_overflow: int):
+    """Records connects, checkouts and how long connections are held per engine.
+
+    A checkout taking the last free connection is counted as exhausting the pool,
+    the next one waits for a checkin (or fails after pool_timeout)
+    """
+    pool = engine.sync_engine.pool
+
+    @event.listens_for(pool, 'connect')
+    def on_connect(dbapi_connection, connection_record):
+        connection_record.info['connected_at'] = time.perf_counter()
+        metrics.inc(f'db_pool_connects_{name}')
+
+    @event.listens_for(pool, 'checkout')
+    def on_checkout(dbapi_connection, connection_record, connection_proxy):
+        connection_record.info['checked_out_at'] = time.perf_counter()
+        metrics.inc(f'db_pool_checkouts_{name}')
+        if pool.checkedout() >= pool.size() + max_overflow:
+            metrics.inc(f'db_pool_exhausted_{name}')
+
+    @event.listens_for(pool, 'checkin')
+    def on_checkin(dbapi_connection, connection_record):
+        checked_out_at = connection_record.info.pop('checked_out_at', None)
+        if checked_out_at is not None:
+            metrics.observe(f'db_pool_hold_{name}', time.perf_counter() - checked_out_at)
+
+
 class DatabaseConnector:
     def __init__(
         self,
         url: str,
         pool_size: int = 5,
         max_overflow: int = 10,
+        pool_timeout: float = 30,
+        pool_recycle: int = -1,
+        pool_pre_ping: bool = False,
+        statement_cache_size: int = 100,
+        server_settings: dict[str, str] | None = None,
+        replica_url: str | None = None,
     ) -> None:
-        self.engine: AsyncEngine = create_async_engine(
-            url=url,
+        engine_kwargs = dict(
             echo=False,
+            poolclass=InstrumentedQueuePool,
             pool_size=pool_size,
             max_overflow=max_overflow,
+            pool_timeout=pool_timeout,
+            pool_recycle=pool_recycle,
+            pool_pre_ping=pool_pre_ping,
+            connect_args={
+                'prepared_statement_cache_size': statement_cache_size,
+                'statement_cache_size': statement_cache_size,
+                'server_settings': server_settings or {},
+            },
+        )
+        self.engine: AsyncEngine = create_async_engine(
+            url=url, pool_logging_name='primary', **engine_kwargs
         )
+        instrument_pool(self.engine, 'primary', max_overflow)
         self.session_factory: async_sessionmaker[AsyncSession] = async_sessionmaker(
             bind=self.engine,
             autoflush=False,
@@ -158,13 +552,95 @@ class DatabaseConnector:
             expire_on_commit=False,
         )
 
+        # read-only paths go to the replica if there is one
+        self.read_engine: AsyncEngine = self.engine
+        self.read_session_factory: async_sessionmaker[AsyncSession] = self.session_factory
+        if replica_url is not None:
+            self.read_engine = create_async_engine(
+                url=replica_url, pool_logging_name='replica', **engine_kwargs
+            )
+            instrument_pool(self.read_engine, 'replica', max_overflow)
+            self.read_session_factory = async_sessionmaker(
+                bind=self.read_engine,
+                autoflush=False,
+                autocommit=False,
+                expire_on_commit=False,
+            )
+
+    @property
+    def raw_dsn(self) -> str:
+        """Primary URL usable by plain asyncpg connections"""
+        return self.engine.url.set(drivername='postgresql').render_as_string(
+            hide_password=False
+        )
+
+    def pool_stats(self) -> dict[str, dict[str, int]]:
+        engines = {'primary': self.engine}
+        if self.read_engine is not self.engine:
+            engines['replica'] = self.read_engine
+        return {
+            name: {
+                'size': engine.pool.size(),
+                'checked_out': engine.pool.checkedout(),
+                'overflow': engine.pool.overflow(),
+            }
+            for name, engine in engines.items()
+        }
+
     async def dispose(self) -> None:
         await self.engine.dispose()
+        if self.read_engine is not self.engine:
+            await self.read_engine.dispose()
 
     async def create_all(self):
         async with self.engine.begin() as conn:
             await conn.run_sync(Base.metadata.create_all)
+            await apply_migrations(conn)
+
+    async def check_schema(self):
+        """Raises SchemaOutdatedError if the database lags behind the models.
+
+        For tools running next to the bot, they don't take DDL locks on live tables
+        """
+        async with self.engine.connect() as conn:
+            problems = await conn.run_sync(_schema_problems)
+        if problems:
+            raise SchemaOutdatedError(
+                f"Database schema is out of date, start the bot to migrate it: "
+                f"{', '.join(problems)}"
+            )
+
+
+def _schema_problems(conn) -> list[str]:
+    inspector = inspect(conn)
+    problems = []
+    for table in Base.metadata.sorted_tables:
+        if not inspector.has_table(table.name):
+            problems.append(f"no table {table.name}")
+            continue
+        columns = {column['name']: column for column in inspector.get_columns(table.name)}
+        for column in table.columns:
+            existing = columns.get(column.name)
+            if existing is None:
+                problems.append(f"no column {table.name}.{column.name}")
+            elif column.nullable and not existing['nullable']:
+                problems.append(f"{table.name}.{column.name} is NOT NULL")
+    return problems
 
 
 def get_db(settings: Settings) -> DatabaseConnector:
-    return DatabaseConnector(url=settings.DB_URL.get_secret_value())
+    return DatabaseConnector(
+        url=settings.DB_URL.get_secret_value(),
+        pool_size=settings.DB_POOL_SIZE,
+        max_overflow=settings.DB_MAX_OVERFLOW,
+        pool_timeout=settings.DB_POOL_TIMEOUT,
+        pool_recycle=settings.DB_POOL_RECYCLE,
+        pool_pre_ping=settings.DB_POOL_PRE_PING,
+        statement_cache_size=settings.DB_STATEMENT_CACHE_SIZE,
+        server_settings=settings.DB_SERVER_SETTINGS,
+        replica_url=(
+            settings.DB_REPLICA_URL.get_secret_value()
+            if settings.DB_REPLICA_URL is not None
+            else None
+        ),
+    )
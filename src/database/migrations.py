@@ -0,0 +1,207 @@
+from sqlalchemy.ext.asyncio import AsyncConnection
+
+# Schema is created with `Base.metadata.create_all`, which only creates missing tables.
+# Changes to already existing tables go here. Every statement must be idempotent,
+# they are all executed on each startup right after `create_all`.
+MIGRATIONS = [
+    # `links` used to be a `;`-joined varchar, now it is a jsonb array of link objects
+    """
+    DO $$
+    BEGIN
+        IF (
+            SELECT data_type FROM information_schema.columns
+            WHERE table_schema = current_schema()
+                AND table_name = 'scheduled_messages'
+                AND column_name = 'links'
+        ) <> 'jsonb' THEN
+            ALTER TABLE scheduled_messages
+                ALTER COLUMN links TYPE jsonb USING to_jsonb(string_to_array(links, ';'));
+            UPDATE scheduled_messages
+            SET links = (
+                SELECT jsonb_agg(jsonb_build_object('url', url))
+                FROM jsonb_array_elements_text(links) AS url
+            )
+            WHERE links IS NOT NULL;
+        END IF;
+    END
+    $$
+    """,
+    # retention needs to know when a message left the queue, old rows only have created_at
+    """
+    DO $$
+    BEGIN
+        IF NOT EXISTS (
+            SELECT 1 FROM information_schema.columns
+            WHERE table_schema = current_schema()
+                AND table_name = 'scheduled_messages'
+                AND column_name = 'finished_at'
+        ) THEN
+            ALTER TABLE scheduled_messages ADD COLUMN finished_at timestamptz;
+            UPDATE scheduled_messages SET finished_at = created_at WHERE status <> 'NOT_SENT';
+        END IF;
+    END
+    $$
+    """,
+    """
+    CREATE INDEX IF NOT EXISTS ix_scheduled_messages_queue
+        ON scheduled_messages (group_pair_id, created_at) WHERE status = 'NOT_SENT'
+    """,
+    """
+    CREATE INDEX IF NOT EXISTS ix_scheduled_messages_finished_at
+        ON scheduled_messages (finished_at) WHERE status <> 'NOT_SENT'
+    """,
+    """
+    DO $$
+    BEGIN
+        IF NOT EXISTS (
+            SELECT 1 FROM information_schema.columns
+            WHERE table_schema = current_schema()
+                AND table_name = 'scheduled_messages'
+                AND column_name = 'content_hash'
+        ) THEN
+            ALTER TABLE scheduled_messages ADD COLUMN content_hash varchar(64);
+        END IF;
+    END
+    $$
+    """,
+    """
+    CREATE INDEX IF NOT EXISTS ix_scheduled_messages_content_hash
+        ON scheduled_messages (content_hash)
+    """,
+    # bulk imported messages have no source message
+    """
+    DO $$
+    BEGIN
+        IF (
+            SELECT is_nullable FROM information_schema.columns
+            WHERE table_schema = current_schema()
+                AND table_name = 'scheduled_messages'
+                AND column_name = 'message_id'
+        ) = 'NO' THEN
+            ALTER TABLE scheduled_messages ALTER COLUMN message_id DROP NOT NULL;
+        END IF;
+    END
+    $$
+    """,
+    """
+    ALTER TABLE group_pairs
+        ADD COLUMN IF NOT EXISTS extra_chat_ids bigint[] NOT NULL DEFAULT '{}'
+    """,
+    # pair_stats are kept up to date by statement level triggers, so inserts (COPY too),
+    # status changes and retention deletes are accounted once per statement
+    """
+    CREATE OR REPLACE FUNCTION update_pair_stats() RETURNS trigger AS $$
+    BEGIN
+        IF TG_OP = 'INSERT' THEN
+            INSERT INTO pair_stats AS ps
+                (group_pair_id, queued, sent, error, last_sent_at, created_at)
+            SELECT
+                group_pair_id,
+                count(*) FILTER (WHERE status = 'NOT_SENT'),
+                count(*) FILTER (WHERE status = 'SENT'),
+                count(*) FILTER (WHERE status = 'ERROR'),
+                max(finished_at) FILTER (WHERE status = 'SENT'),
+                now()
+            FROM new_rows
+            GROUP BY group_pair_id
+            ON CONFLICT (group_pair_id) DO UPDATE SET
+                queued = ps.queued + EXCLUDED.queued,
+                sent = ps.sent + EXCLUDED.sent,
+                error = ps.error + EXCLUDED.error,
+                last_sent_at = GREATEST(ps.last_sent_at, EXCLUDED.last_sent_at);
+        ELSIF TG_OP = 'UPDATE' THEN
+            INSERT INTO pair_stats AS ps
+                (group_pair_id, queued, sent, error, last_sent_at, created_at)
+            SELECT
+                n.group_pair_id,
+                sum((n.status = 'NOT_SENT')::int - (o.status = 'NOT_SENT')::int),
+                sum((n.status = 'SENT')::int - (o.status = 'SENT')::int),
+                sum((n.status = 'ERROR')::int - (o.status = 'ERROR')::int),
+                max(n.finished_at) FILTER (WHERE n.status = 'SENT'),
+                now()
+            FROM new_rows n JOIN old_rows o USING (id)
+            WHERE n.status IS DISTINCT FROM o.status
+            GROUP BY n.group_pair_id
+            ON CONFLICT (group_pair_id) DO UPDATE SET
+                queued = ps.queued + EXCLUDED.queued,
+                sent = ps.sent + EXCLUDED.sent,
+                error = ps.error + EXCLUDED.error,
+                last_sent_at = GREATEST(ps.last_sent_at, EXCLUDED.last_sent_at);
+        ELSE
+            -- only queued messages leave the counters, finished ones stay counted
+            UPDATE pair_stats AS ps SET queued = ps.queued - deleted.count
+            FROM (
+                SELECT group_pair_id, count(*) AS count FROM old_rows
+                WHERE status = 'NOT_SENT'
+                GROUP BY group_pair_id
+            ) AS deleted
+            WHERE ps.group_pair_id = deleted.group_pair_id;
+        END IF;
+        RETURN NULL;
+    END
+    $$ LANGUAGE plpgsql
+    """,
+    """
+    DO $$
+    BEGIN
+        IF NOT EXISTS (
+            SELECT 1 FROM pg_trigger WHERE tgname = 'scheduled_messages_stats_insert'
+        ) THEN
+            LOCK TABLE scheduled_messages IN SHARE ROW EXCLUSIVE MODE;
+
+            DELETE FROM pair_stats;
+            INSERT INTO pair_stats
+                (group_pair_id, queued, sent, error, last_sent_at, created_at)
+            SELECT
+                group_pair_id,
+                count(*) FILTER (WHERE status = 'NOT_SENT'),
+                count(*) FILTER (WHERE status = 'SENT'),
+                count(*) FILTER (WHERE status = 'ERROR'),
+                max(finished_at) FILTER (WHERE status = 'SENT'),
+                now()
+            FROM (
+                SELECT group_pair_id, status, finished_at FROM scheduled_messages
+                UNION ALL
+                SELECT group_pair_id, status, finished_at FROM scheduled_messages_archive
+            ) AS messages
+            GROUP BY group_pair_id;
+
+            CREATE TRIGGER scheduled_messages_stats_insert
+                AFTER INSERT ON scheduled_messages
+                REFERENCING NEW TABLE AS new_rows
+                FOR EACH STATEMENT EXECUTE FUNCTION update_pair_stats();
+            CREATE TRIGGER scheduled_messages_stats_update
+                AFTER UPDATE ON scheduled_messages
+                REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+                FOR EACH STATEMENT EXECUTE FUNCTION update_pair_stats();
+            CREATE TRIGGER scheduled_messages_stats_delete
+                AFTER DELETE ON scheduled_messages
+                REFERENCING OLD TABLE AS old_rows
+                FOR EACH STATEMENT EXECUTE FUNCTION update_pair_stats();
+        END IF;
+    END
+    $$
+    """,
+    """
+    DO $$
+    BEGIN
+        IF NOT EXISTS (
+            SELECT 1 FROM information_schema.columns
+            WHERE table_schema = current_schema()
+                AND table_name = 'scheduled_messages'
+                AND column_name = 'attempts'
+        ) THEN
+            ALTER TABLE scheduled_messages
+                ADD COLUMN attempts integer NOT NULL DEFAULT 0,
+                ADD COLUMN next_attempt_at timestamptz,
+                ADD COLUMN last_error varchar;
+        END IF;
+    END
+    $$
+    """,
+]
+
+
+async def apply_migrations(conn: AsyncConnection) -> None:
+    for statement in MIGRATIONS:
+        await conn.exec_driver_sql(statement)
@@ -0,0 +1,77 @@
+import asyncio
+import logging
+from typing import Callable
+
+import asyncpg
+
+# reconnects are delayed exponentially up to the max, reset once connected
+RECONNECT_DELAY_SECONDS = 1
+RECONNECT_MAX_DELAY_SECONDS = 60
+
+
+class NotifyListener:
+    """Keeps one dedicated connection LISTENing to postgres notification channels.
+
+    The connection is re-established when lost. Notifications sent meanwhile are
+    lost too, so `on_reconnect` callbacks should resync whatever they track
+    """
+
+    def __init__(self, dsn: str):
+        self.dsn = dsn
+        self.callbacks: dict[str, list[Callable[[str], None]]] = {}
+        self.reconnect_callbacks: list[Callable[[], None]] = []
+        self.task: asyncio.Task | None = None
+
+    def subscribe(self, channel: str, callback: Callable[[str], None]):
+        self.callbacks.setdefault(channel, []).append(callback)
+
+    def on_reconnect(self, callback: Callable[[], None]):
+        self.reconnect_callbacks.append(callback)
+
+    def start(self):
+        self.task = asyncio.create_task(self._listen(), name='notify_listener')
+
+    async def stop(self):
+        if self.task is None:
+            return
+        self.task.cancel()
+        await asyncio.gather(self.task, return_exceptions=True)
+
+    def _dispatch(self, connection, pid: int, channel: str, payload: str):
+        for callback in self.callbacks.get(channel, []):
+            try:
+                callback(payload)
+            except Exception:
+                logging.exception(f"Failed to handle notification {channel=} {payload=}")
+
+    async def _listen(self):
+        delay = RECONNECT_DELAY_SECONDS
+        while True:
+            connection = None
+            try:
+                connection = await asyncpg.connect(self.dsn)
+                lost = asyncio.Event()
+                connection.add_termination_listener(lambda _: lost.set())
+                for channel in self.callbacks:
+                    await connection.add_listener(channel, self._dispatch)
+                logging.info(f"Listening to {list(self.callbacks)}")
+                delay = RECONNECT_DELAY_SECONDS
+
+                for callback in self.reconnect_callbacks:
+                    callback()
+
+                await lost.wait()
+                logging.warning("Listener connection is lost")
+            except Exception:
+                # asyncpg.InterfaceError and friends aren't PostgresError,
+                # the listener must survive whatever the connection throws
+                logging.exception("Listener connection failed:")
+            finally:
+                if connection is not None and not connection.is_closed():
+                    try:
+                        await connection.close()
+                    except Exception:
+                        connection.terminate()
+            logging.info(f"Reconnecting the listener in {delay}s")
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, RECONNECT_MAX_DELAY_SECONDS)
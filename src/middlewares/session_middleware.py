@@ -2,11 +2,28 @@ from typing import Any, Awaitable, Callable, Dict
 
 from aiogram import BaseMiddleware
 from aiogram.types import Message
+from sqlalchemy import event
+from sqlalchemy.orm import Session
 
 from database.database_connector import DatabaseConnector
+from resender_bot.metrics import metrics
+
+DB_USED_KEY = 'db_used'
+
+
+@event.listens_for(Session, 'after_begin')
+def _mark_db_used(session: Session, transaction, connection):
+    # fired only when a session actually checks out a connection
+    session.info[DB_USED_KEY] = True
 
 
 class DBSessionMiddleware(BaseMiddleware):
+    """Injects sessions that connect to the database on their first statement only.
+
+    `db_session` goes to the primary, `db_read_session` to the read replica (if any).
+    Handlers that never touch them don't check out a pooled connection
+    """
+
     def __init__(self, db: DatabaseConnector):
         self.db = db
 
@@ -16,7 +33,17 @@ class DBSessionMiddleware(BaseMiddleware):
         event: Message,
         data: Dict[str, Any],
     ) -> Any:
-        async with self.db.session_factory.begin() as db_session:
+        metrics.inc('updates_total')
+        async with (
+            self.db.session_factory() as db_session,
+            self.db.read_session_factory() as db_read_session,
+        ):
             data['db_session'] = db_session
+            data['db_read_session'] = db_read_session
             res = await handler(event, data)
-            return res
+            if db_session.in_transaction():
+                await db_session.commit()
+
+        if db_session.info.get(DB_USED_KEY) or db_read_session.info.get(DB_USED_KEY):
+            metrics.inc('updates_with_db')
+        return res
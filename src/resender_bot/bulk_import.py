@@ -0,0 +1,243 @@
+"""Bulk import of a channel backlog into the queue of a pair.
+
+    bot-import <source group id> <posts.jsonl | posts.csv>
+
+JSONL rows are objects, CSV files have a header; both with the fields of `ImportRow`.
+In CSV `links` are separated by whitespace. Rows are validated and streamed into
+`scheduled_messages` with a single COPY, in file order.
+
+Posts already queued for the channel or sent to it within the dedup window are
+skipped, as are repeats within the file. Media rows are matched by `file_unique_id`
+like live posts, rows without it are never treated as duplicates.
+"""
+
+import argparse
+import asyncio
+import csv
+import json
+import logging
+import time
+import uuid
+from datetime import UTC, datetime, timedelta
+from pathlib import Path
+from typing import AsyncIterator, Iterator, Literal
+
+import asyncpg
+from pydantic import BaseModel, ValidationError, field_validator, model_validator
+
+from database.database_connector import (
+    QUEUE_CHANNEL,
+    DatabaseConnector,
+    GroupPair,
+    MessageLink,
+    MessageStatusEnum,
+    ScheduledMessage,
+    get_db,
+    get_recent_hashes,
+)
+from resender_bot.fingerprint import content_fingerprint
+from resender_bot.logging_config import setup_logs
+from resender_bot.settings import Settings
+
+PROGRESS_EVERY = 1000
+
+COPY_COLUMNS = [
+    'group_pair_id',
+    'status',
+    'text',
+    'links',
+    'file_id',
+    'media_group_id',
+    'media_type',
+    'meta_info',
+    'content_hash',
+    'created_at',
+]
+
+
+class ImportRow(BaseModel):
+    text: str | None = None
+    links: list[str] = []
+    file_id: str | None = None
+    # stable id of the file, the same for every bot
+    file_unique_id: str | None = None
+    media_type: Literal['PHOTO', 'VIDEO', 'ANIMATION'] | None = None
+    media_group_id: str | None = None
+
+    @field_validator(
+        'text', 'file_id', 'file_unique_id', 'media_type', 'media_group_id', mode='before'
+    )
+    @classmethod
+    def empty_to_none(cls, value):
+        return value or None
+
+    @field_validator('links', mode='before')
+    @classmethod
+    def split_links(cls, value):
+        if isinstance(value, str):
+            return value.split()
+        return value or []
+
+    @model_validator(mode='after')
+    def check_content(self):
+        if (self.file_id is None) != (self.media_type is None):
+            raise ValueError("file_id and media_type must be set together")
+        if self.media_group_id is not None and self.file_id is None:
+            raise ValueError("album items must have file_id and media_type")
+        if not self.text and not self.links and self.file_id is None:
+            raise ValueError("row has no content")
+        return self
+
+
+class ImportStats(BaseModel):
+    imported: int = 0
+    invalid: int = 0
+    duplicates: int = 0
+
+
+def read_rows(path: Path) -> Iterator[tuple[int, dict | None]]:
+    """Yields (line number, raw row) from a JSONL or CSV file, None for broken lines"""
+    with path.open(encoding='utf-8', newline='') as f:
+        if path.suffix.lower() == '.csv':
+            # line 1 is the header
+            for line_no, row in enumerate(csv.DictReader(f), start=2):
+                row.pop(None, None)  # values without a column
+                yield line_no, row
+            return
+
+        for line_no, line in enumerate(f, start=1):
+            if not line.strip():
+                continue
+            try:
+                yield line_no, json.loads(line)
+            except json.JSONDecodeError:
+                yield line_no, None
+
+
+def row_fingerprint(row: ImportRow) -> str | None:
+    if row.file_id is not None and row.file_unique_id is None:
+        # a file_id differs from the one of the same file posted live
+        return None
+    file_unique_ids = [row.file_unique_id] if row.file_unique_id else []
+    return content_fingerprint(row.text, file_unique_ids, row.links)
+
+
+async def import_records(
+    rows: Iterator[tuple[int, dict | None]],
+    group_id: int,
+    stats: ImportStats,
+    known_hashes: set[str] | None = None,
+) -> AsyncIterator[tuple]:
+    """Validates rows and turns them into COPY records, reporting progress.
+
+    Rows with a fingerprint from `known_hashes` or repeated in the file are skipped
+    """
+    # media group ids are namespaced, so they can't match ids of real albums
+    run_id = uuid.uuid4().hex[:8]
+    started_at = datetime.now(UTC)
+    start = time.perf_counter()
+    seen_hashes = set(known_hashes or ())
+
+    for line_no, raw_row in rows:
+        try:
+            row = ImportRow.model_validate(raw_row)
+        except ValidationError as e:
+            stats.invalid += 1
+            logging.warning(f"Line {line_no}: skipping invalid row: {e}")
+            continue
+
+        content_hash = row_fingerprint(row)
+        # as live posts, album items are never skipped one by one
+        if content_hash is not None and row.media_group_id is None:
+            if content_hash in seen_hashes:
+                stats.duplicates += 1
+                continue
+            seen_hashes.add(content_hash)
+
+        links = [MessageLink(url=link).model_dump() for link in row.links]
+        yield (
+            group_id,
+            MessageStatusEnum.NOT_SENT.value,
+            row.text,
+            json.dumps(links) if links else None,
+            row.file_id,
+            f"import-{run_id}-{row.media_group_id}" if row.media_group_id else None,
+            row.media_type,
+            'bulk-import',
+            content_hash,
+            # keeps the file order for OLDEST send order
+            started_at + timedelta(microseconds=stats.imported),
+        )
+        stats.imported += 1
+
+        if stats.imported % PROGRESS_EVERY == 0:
+            rate = stats.imported / (time.perf_counter() - start)
+            logging.info(
+                f"Imported {stats.imported} rows ({rate:.0f} rows/s), "
+                f"{stats.invalid} invalid, {stats.duplicates} duplicates"
+            )
+
+
+async def bulk_import(
+    db: DatabaseConnector,
+    group_id: int,
+    path: Path,
+    dedup_window: timedelta | None = None,
+) -> ImportStats:
+    known_hashes = set()
+    async with db.session_factory() as session:
+        group_pair = await session.get(GroupPair, group_id)
+        if group_pair is None:
+            raise ValueError(f"{group_id=} is not registered")
+        if dedup_window is not None:
+            known_hashes = await get_recent_hashes(
+                session,
+                group_pair.public_chat_id,
+                sent_after=datetime.now(UTC) - dedup_window,
+            )
+
+    stats = ImportStats()
+    connection = await asyncpg.connect(db.raw_dsn)
+    try:
+        async with connection.transaction():
+            await connection.copy_records_to_table(
+                ScheduledMessage.__tablename__,
+                records=import_records(read_rows(path), group_id, stats, known_hashes),
+                columns=COPY_COLUMNS,
+            )
+            # wakes the sender of the pair if the bot is running
+            await connection.execute(
+                'SELECT pg_notify($1, $2)', QUEUE_CHANNEL, str(group_id)
+            )
+    finally:
+        await connection.close()
+    return stats
+
+
+async def main(group_id: int, path: Path):
+    setup_logs()
+    settings = Settings()
+    db = get_db(settings)
+    try:
+        # the bot owns migrations, DDL here would lock the live queue table
+        await db.check_schema()
+        dedup_window = None
+        if settings.DEDUP_WINDOW_HOURS is not None:
+            dedup_window = timedelta(hours=settings.DEDUP_WINDOW_HOURS)
+        stats = await bulk_import(db, group_id, path, dedup_window)
+    finally:
+        await db.dispose()
+    logging.info(
+        f"Import finished: {stats.imported} imported, "
+        f"{stats.invalid} invalid, {stats.duplicates} duplicates"
+    )
+
+
+def run_import():
+    parser = argparse.ArgumentParser(
+        prog='bot-import', description="Queue a backlog of posts for a source group"
+    )
+    parser.add_argument('group_id', type=int, help="id of a registered source group")
+    parser.add_argument('path', type=Path, help="JSONL or CSV file with posts")
+    args = parser.parse_args()
+    asyncio.run(main(args.group_id, args.path))
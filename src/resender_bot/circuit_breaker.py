@@ -0,0 +1,100 @@
+import logging
+import time
+from datetime import UTC, datetime
+
+from aiogram import Bot
+from aiogram.enums import ChatMemberStatus
+from aiogram.exceptions import (
+    TelegramAPIError,
+    TelegramBadRequest,
+    TelegramForbiddenError,
+    TelegramNotFound,
+)
+
+# bad requests caused by the channel itself, not by the message
+CHANNEL_ERROR_MARKERS = (
+    'chat not found',
+    'not enough rights',
+    'need administrator rights',
+    'chat_write_forbidden',
+    'chat_admin_required',
+)
+
+
+def is_channel_error(exc: BaseException) -> bool:
+    """The destination channel is gone or the bot can't post there"""
+    if isinstance(exc, (TelegramForbiddenError, TelegramNotFound)):
+        return True
+    return isinstance(exc, TelegramBadRequest) and any(
+        marker in exc.message.lower() for marker in CHANNEL_ERROR_MARKERS
+    )
+
+
+async def probe_channel(bot: Bot, chat_id: int) -> bool:
+    """Cheap check that the bot is still an administrator of the channel"""
+    try:
+        member = await bot.get_chat_member(chat_id, bot.id)
+    except TelegramAPIError as e:
+        logging.info(f"{chat_id=}: Probe failed: {e}")
+        return False
+    return member.status in (ChatMemberStatus.ADMINISTRATOR, ChatMemberStatus.CREATOR)
+
+
+class CircuitBreaker:
+    """Consecutive send failures to one channel.
+
+    Opens after `threshold` failures of the same class in a row. While it is open
+    sends to the channel are suspended and the channel is probed every
+    `probe_interval` seconds, a successful probe closes it
+    """
+
+    def __init__(self, threshold: int, probe_interval: float):
+        self.threshold = threshold
+        self.probe_interval = probe_interval
+        self.failures = 0
+        self.error_class: str | None = None
+        self.last_error: str | None = None
+        self.opened_at: datetime | None = None
+        self.next_probe_at = 0.0
+
+    @property
+    def is_open(self) -> bool:
+        return self.opened_at is not None
+
+    def record_failure(self, exc: BaseException) -> bool:
+        """Returns True if this failure opened the breaker"""
+        error_class = type(exc).__name__
+        if error_class != self.error_class:
+            self.error_class = error_class
+            self.failures = 0
+        self.failures += 1
+        self.last_error = f"{error_class}: {exc}"
+
+        if self.is_open or self.failures < self.threshold:
+            return False
+        self.opened_at = datetime.now(UTC)
+        self.next_probe_at = time.monotonic() + self.probe_interval
+        return True
+
+    def record_success(self) -> bool:
+        """Returns True if this success closed the breaker"""
+        was_open = self.is_open
+        self.failures = 0
+        self.error_class = None
+        self.opened_at = None
+        return was_open
+
+    def probe_in(self) -> float:
+        """Seconds until the next probe is due"""
+        return max(0.0, self.next_probe_at - time.monotonic())
+
+    def probe_failed(self):
+        self.next_probe_at = time.monotonic() + self.probe_interval
+
+    def __str__(self):
+        if not self.is_open:
+            return "ok"
+        return (
+            f"suspended since {self.opened_at.strftime('%Y-%m-%d %H:%M:%S %Z')}"
+            f" ({self.last_error})"
+        )
@@ -21,6 +21,14 @@ async def set_bot_commands(bot: Bot) -> None:
                 command="set_interval",
                 description="/set_interval <seconds> - set delay before messages in seconds",
             ),
+            BotCommand(
+                command="add_target",
+                description="/add_target <channel id> - also post copies to this channel",
+            ),
+            BotCommand(
+                command="remove_target",
+                description="/remove_target <channel id> - stop posting copies to this channel",
+            ),
             BotCommand(
                 command="info",
                 description="get info about settings for current chat",
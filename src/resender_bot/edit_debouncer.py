@@ -0,0 +1,79 @@
+import asyncio
+import logging
+
+from pydantic import BaseModel
+
+from database.database_connector import (
+    DatabaseConnector,
+    MessageLink,
+    update_scheduled_message,
+)
+
+
+class PendingEdit(BaseModel):
+    text: str | None
+    links: list[MessageLink] | None
+    file_id: str | None
+    media_type: str | None
+    content_hash: str | None = None
+
+
+class EditDebouncer:
+    """Collects edits of queued messages and writes only the last one of a burst"""
+
+    def __init__(self, db: DatabaseConnector, delay: float):
+        self.db = db
+        self.delay = delay
+        self.pending: dict[tuple[int, int], PendingEdit] = {}
+        self.timers: dict[tuple[int, int], asyncio.TimerHandle] = {}
+        self.flush_tasks: set[asyncio.Task] = set()
+
+    def push(self, group_id: int, message_id: int, edit: PendingEdit):
+        key = (group_id, message_id)
+        self.pending[key] = edit
+
+        timer = self.timers.pop(key, None)
+        if timer is not None:
+            timer.cancel()
+
+        loop = asyncio.get_running_loop()
+        self.timers[key] = loop.call_later(self.delay, self._start_flush, key)
+
+    def _start_flush(self, key: tuple[int, int]):
+        task = asyncio.create_task(self.flush(key))
+        self.flush_tasks.add(task)
+        task.add_done_callback(self.flush_tasks.discard)
+
+    async def flush(self, key: tuple[int, int]):
+        self.timers.pop(key, None)
+        edit = self.pending.pop(key, None)
+        if edit is None:
+            return
+
+        group_id, message_id = key
+        try:
+            async with self.db.session_factory.begin() as session:
+                updated_id = await update_scheduled_message(
+                    session,
+                    group_id,
+                    message_id,
+                    text=edit.text,
+                    links=edit.links,
+                    file_id=edit.file_id,
+                    media_type=edit.media_type,
+                    content_hash=edit.content_hash,
+                )
+        except Exception:
+            logging.exception(f"{group_id=}: Failed to apply edit of {message_id=}")
+            return
+
+        if updated_id is None:
+            logging.info(f"{group_id=}: {message_id=} is not queued, edit is ignored")
+        else:
+            logging.info(f"{group_id=}: Updated scheduled message {updated_id=}")
+
+    async def flush_all(self):
+        for timer in self.timers.values():
+            timer.cancel()
+        await asyncio.gather(*(self.flush(key) for key in list(self.pending)))
+        await asyncio.gather(*self.flush_tasks)
@@ -0,0 +1,23 @@
+import hashlib
+import json
+
+
+def normalize_text(text: str | None) -> str:
+    if not text:
+        return ''
+    return ' '.join(text.split()).casefold()
+
+
+def content_fingerprint(
+    text: str | None, file_ids: list[str], links: list[str]
+) -> str | None:
+    """Stable hash of a post's content, None for posts without any content.
+
+    `file_ids` should be Telegram's `file_unique_id` where available: unlike `file_id`
+    it is the same for every copy of a file
+    """
+    normalized_text = normalize_text(text)
+    if not normalized_text and not file_ids and not links:
+        return None
+    content = json.dumps([normalized_text, file_ids, links], ensure_ascii=False)
+    return hashlib.sha256(content.encode()).hexdigest()
@@ -0,0 +1,43 @@
+from datetime import UTC, datetime
+
+from aiogram import Router
+from aiogram.filters import Command, CommandObject
+from aiogram.types import BufferedInputFile, Message
+
+from resender_bot import profiler
+from resender_bot.settings import Settings
+
+router = Router()
+
+DEFAULT_PROFILE_SECONDS = 30
+MAX_PROFILE_SECONDS = 300
+
+
+async def is_admin(message: Message, settings: Settings) -> bool:
+    return message.from_user is not None and message.from_user.id == settings.ADMIN_ID
+
+
+@router.message(Command('profile'), is_admin)
+async def profile_handler(message: Message, command: CommandObject):
+    try:
+        seconds = float(command.args) if command.args else DEFAULT_PROFILE_SECONDS
+    except ValueError:
+        await message.answer("/profile takes the number of seconds as parameter")
+        return
+    if not 0 < seconds <= MAX_PROFILE_SECONDS:
+        await message.answer(f"Profile for up to {MAX_PROFILE_SECONDS} seconds")
+        return
+
+    if profiler.is_running():
+        await message.answer("Profiling is already running")
+        return
+
+    async with profiler.lock:
+        await message.answer(f"Profiling for {seconds:g}s...")
+        report = await profiler.run(seconds)
+
+    filename = f"profile-{datetime.now(UTC):%Y%m%d-%H%M%S}.txt"
+    await message.answer_document(
+        BufferedInputFile(report.encode(), filename=filename),
+        caption=f"Profile of {seconds:g}s",
+    )
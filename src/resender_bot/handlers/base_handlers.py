@@ -1,4 +1,5 @@
 import logging
+from datetime import UTC, datetime, timedelta
 
 import aiogram
 from aiogram import F, Router, Bot
@@ -16,13 +17,21 @@ from sqlalchemy.ext.asyncio import AsyncSession
 
 from database.database_connector import (
     GroupPair,
+    MessageLink,
+    PairStats,
     SendOrderEnum,
     ScheduledMessage,
+    find_duplicate,
     get_all_pairs,
-    get_scheduled_message,
+    notify_message_queued,
+    notify_pair_changed,
     upsert_new_group_pair,
 )
+from resender_bot.edit_debouncer import EditDebouncer, PendingEdit
+from resender_bot.fingerprint import content_fingerprint
+from resender_bot.metrics import metrics
 from resender_bot.sender_task import SenderTaskManager
+from resender_bot.settings import Settings
 
 router = Router()
 
@@ -53,6 +62,12 @@ async def start_group_handler(message: Message) -> None:
             aiogram.html.quote(
                 "/set_interval <seconds> - set delay before messages in seconds"
             ),
+            aiogram.html.quote(
+                "/add_target <channel id> - also post copies to this channel"
+            ),
+            aiogram.html.quote(
+                "/remove_target <channel id> - stop posting copies to this channel"
+            ),
             "/info - get info about settings for current chat",
         ],
     )
@@ -68,6 +83,15 @@ async def is_bot_admin(bot: Bot, channel_id: int) -> bool:
         return False
 
 
+def parse_channel_id(args: str | None) -> int | None:
+    try:
+        if not args.startswith("-100"):
+            args = "-100" + args
+        return int(args)
+    except (ValueError, TypeError, AttributeError):
+        return None
+
+
 @router.message(Command('register'), F.chat.type != ChatType.PRIVATE)
 async def register_handler(
     message: Message,
@@ -78,12 +102,8 @@ async def register_handler(
 ):
     private_chat_id = message.chat.id
 
-    try:
-        channel_id_str = command.args
-        if not channel_id_str.startswith("-100"):
-            channel_id_str = "-100" + channel_id_str
-        channel_id = int(channel_id_str)
-    except (ValueError, TypeError, AttributeError):
+    channel_id = parse_channel_id(command.args)
+    if channel_id is None:
         await message.answer("/register requires integer as parameter")
         return
 
@@ -92,13 +112,18 @@ async def register_handler(
         return
 
     await upsert_new_group_pair(db_session, private_chat_id, channel_id)
+    await notify_pair_changed(db_session, private_chat_id)
     await db_session.commit()
+    # noinspection PyTypeChecker
+    task_manager.update_pair(await db_session.get(GroupPair, private_chat_id))
     task_manager.add_task(private_chat_id)
     await message.answer("Registered successfully!")
 
 
 @router.message(Command('set_random'), F.chat.type != ChatType.PRIVATE)
-async def set_random_handler(message: Message, db_session: AsyncSession):
+async def set_random_handler(
+    message: Message, db_session: AsyncSession, task_manager: SenderTaskManager
+):
     private_chat_id = message.chat.id
 
     chat_pair = await db_session.get(GroupPair, private_chat_id)
@@ -107,11 +132,16 @@ async def set_random_handler(message: Message, db_session: AsyncSession):
         return
 
     chat_pair.send_order = SendOrderEnum.RANDOM
+    await notify_pair_changed(db_session, private_chat_id)
+    await db_session.commit()
+    task_manager.update_pair(chat_pair)
     await message.answer("Order is set to Random!")
 
 
 @router.message(Command('set_ordered'), F.chat.type != ChatType.PRIVATE)
-async def set_ordered_handler(message: Message, db_session: AsyncSession):
+async def set_ordered_handler(
+    message: Message, db_session: AsyncSession, task_manager: SenderTaskManager
+):
     private_chat_id = message.chat.id
 
     chat_pair = await db_session.get(GroupPair, private_chat_id)
@@ -120,6 +150,9 @@ async def set_ordered_handler(message: Message, db_session: AsyncSession):
         return
 
     chat_pair.send_order = SendOrderEnum.OLDEST
+    await notify_pair_changed(db_session, private_chat_id)
+    await db_session.commit()
+    task_manager.update_pair(chat_pair)
     await message.answer("Order is set to Ordered!")
 
 
@@ -144,32 +177,128 @@ async def set_interval_handler(
         return
 
     chat_pair.interval = interval
+    await notify_pair_changed(db_session, private_chat_id)
     await db_session.commit()
     # noinspection PyTypeChecker
     task_manager.update_interval(chat_pair)
     await message.answer(f"Interval is set to {interval}!")
 
 
-@router.message(Command('info'), F.chat.type != ChatType.PRIVATE)
-async def info_handler(message: Message, db_session: AsyncSession):
+@router.message(Command('add_target'), F.chat.type != ChatType.PRIVATE)
+async def add_target_handler(
+    message: Message,
+    bot: Bot,
+    command: CommandObject,
+    db_session: AsyncSession,
+    task_manager: SenderTaskManager,
+):
+    private_chat_id = message.chat.id
+
+    channel_id = parse_channel_id(command.args)
+    if channel_id is None:
+        await message.answer("/add_target requires integer as parameter")
+        return
+
+    chat_pair = await db_session.get(GroupPair, private_chat_id)
+    if chat_pair is None:
+        await message.answer("This chat wasn't registered yet")
+        return
+
+    if channel_id == chat_pair.public_chat_id or channel_id in chat_pair.extra_chat_ids:
+        await message.answer("This channel is already a target")
+        return
+
+    if not await is_bot_admin(bot, channel_id):
+        await message.answer("Bot must be an administrator in the target channel")
+        return
+
+    chat_pair.extra_chat_ids = [*chat_pair.extra_chat_ids, channel_id]
+    await notify_pair_changed(db_session, private_chat_id)
+    await db_session.commit()
+    task_manager.update_pair(chat_pair)
+    await message.answer(f"Posts will be copied to {channel_id} too!")
+
+
+@router.message(Command('remove_target'), F.chat.type != ChatType.PRIVATE)
+async def remove_target_handler(
+    message: Message,
+    command: CommandObject,
+    db_session: AsyncSession,
+    task_manager: SenderTaskManager,
+):
     private_chat_id = message.chat.id
 
+    channel_id = parse_channel_id(command.args)
+    if channel_id is None:
+        await message.answer("/remove_target requires integer as parameter")
+        return
+
     chat_pair = await db_session.get(GroupPair, private_chat_id)
     if chat_pair is None:
         await message.answer("This chat wasn't registered yet")
         return
 
+    if channel_id not in chat_pair.extra_chat_ids:
+        await message.answer("This channel isn't an extra target")
+        return
+
+    chat_pair.extra_chat_ids = [
+        chat_id for chat_id in chat_pair.extra_chat_ids if chat_id != channel_id
+    ]
+    await notify_pair_changed(db_session, private_chat_id)
+    await db_session.commit()
+    task_manager.update_pair(chat_pair)
+    await message.answer(f"Posts won't be copied to {channel_id} anymore")
+
+
+def channel_state(task_manager: SenderTaskManager, chat_id: int) -> str:
+    breaker = task_manager.breakers.get(chat_id)
+    return aiogram.html.quote(str(breaker or 'ok'))
+
+
+@router.message(Command('info'), F.chat.type != ChatType.PRIVATE)
+async def info_handler(
+    message: Message, db_read_session: AsyncSession, task_manager: SenderTaskManager
+):
+    private_chat_id = message.chat.id
+
+    chat_pair = await db_read_session.get(GroupPair, private_chat_id)
+    if chat_pair is None:
+        await message.answer("This chat wasn't registered yet")
+        return
+
+    stats = await db_read_session.get(PairStats, private_chat_id)
+    if stats is None:
+        stats = PairStats(group_pair_id=private_chat_id, queued=0, sent=0, error=0)
+    # one post per interval, the backlog is drained in about queued * interval
+    eta = timedelta(seconds=max(stats.queued, 0) * chat_pair.interval)
+    extra_channels = ', '.join(
+        f"{chat_id} ({channel_state(task_manager, chat_id)})"
+        for chat_id in chat_pair.extra_chat_ids
+    )
+    last_sent = (
+        stats.last_sent_at.strftime('%Y-%m-%d %H:%M:%S %Z')
+        if stats.last_sent_at is not None
+        else 'never'
+    )
+
     await message.answer(
         "Chat Info:\n"
         f"├ Channel id: {chat_pair.public_chat_id}\n"
+        f"├ Channel state: {channel_state(task_manager, chat_pair.public_chat_id)}\n"
+        f"├ Extra channels: {extra_channels or 'none'}\n"
         f"├ This group id: {chat_pair.private_chat_id}\n"
         f"├ Send order: {chat_pair.send_order}\n"
-        f"└ Interval: {chat_pair.interval}\n",
+        f"├ Interval: {chat_pair.interval}\n"
+        f"├ Queued: {stats.queued} (ETA {eta})\n"
+        f"├ Sent: {stats.sent}\n"
+        f"├ Errors: {stats.error}\n"
+        f"└ Last sent: {last_sent}\n",
     )
 
 
-async def in_src(chat_id: int, db_session: AsyncSession):
-    pairs = await get_all_pairs(db_session)
+async def in_src(chat_id: int, db_read_session: AsyncSession):
+    pairs = await get_all_pairs(db_read_session)
     src_ids = [pair.private_chat_id for pair in pairs]
     return chat_id in src_ids
 
@@ -206,7 +335,7 @@ def extract_info(message: Message):
         message_cleared_str, links = extract_text(
             message.caption, message.caption_entities
         )
-    links_str = ';'.join(links) or None
+    message_links = [MessageLink(url=link) for link in links] or None
     file_id = None
     media_type = None
     if message.photo:
@@ -218,50 +347,108 @@ def extract_info(message: Message):
     elif message.animation:
         file_id = message.animation.file_id
         media_type = "ANIMATION"
-    return message_cleared_str, links_str, file_id, media_type
+    return message_cleared_str, message_links, file_id, media_type
+
+
+def extract_fingerprint(
+    message: Message, text: str | None, links: list[MessageLink] | None
+) -> str | None:
+    file_unique_ids = []
+    if message.photo:
+        file_unique_ids.append(message.photo[-1].file_unique_id)
+    elif message.video:
+        file_unique_ids.append(message.video.file_unique_id)
+    elif message.animation:
+        file_unique_ids.append(message.animation.file_unique_id)
+    return content_fingerprint(text, file_unique_ids, [link.url for link in links or []])
 
 
 @router.message()
-async def any_message(message: Message, db_session: AsyncSession):
-    if not await in_src(message.chat.id, db_session):
+async def any_message(
+    message: Message,
+    bot: Bot,
+    db_session: AsyncSession,
+    db_read_session: AsyncSession,
+    settings: Settings,
+    task_manager: SenderTaskManager,
+):
+    if not await in_src(message.chat.id, db_read_session):
         return
 
     logging.info(f"Adding new message: {message.text=}")
 
-    message_cleared_str, links_str, file_id, media_type = extract_info(message)
+    message_cleared_str, message_links, file_id, media_type = extract_info(message)
+    content_hash = extract_fingerprint(message, message_cleared_str, message_links)
+
+    # items of an album arrive one by one, a repeated photo inside a new album
+    # mustn't leave the album incomplete
+    if (
+        content_hash is not None
+        and message.media_group_id is None
+        and settings.DEDUP_WINDOW_HOURS is not None
+    ):
+        # noinspection PyTypeChecker
+        chat_pair: GroupPair = await db_session.get(GroupPair, message.chat.id)
+        duplicate_id = await find_duplicate(
+            db_session,
+            content_hash,
+            chat_pair.public_chat_id,
+            sent_after=datetime.now(UTC) - timedelta(hours=settings.DEDUP_WINDOW_HOURS),
+        )
+        if duplicate_id is not None:
+            logging.info(f"Skipping duplicate of {duplicate_id=}: {message.message_id=}")
+            metrics.inc('duplicates_skipped')
+            # cleaned up from the source group like a sent post
+            try:
+                await bot.delete_message(message.chat.id, message.message_id)
+            except TelegramAPIError:
+                logging.exception(f"Couldn't delete duplicate {message.message_id=}")
+            return
 
     scheduled_msg = ScheduledMessage(
         message_id=message.message_id,
         group_pair_id=message.chat.id,
         text=message_cleared_str,
-        links=links_str,
+        links=message_links,
         file_id=file_id,
         media_group_id=message.media_group_id,
         media_type=media_type,
         meta_info="empty",
+        content_hash=content_hash,
     )
 
     db_session.add(scheduled_msg)
+    if settings.QUEUE_WAKEUPS:
+        # for senders of other processes, ours is woken directly
+        await notify_message_queued(db_session, message.chat.id)
+    await db_session.commit()
+    task_manager.wake_pair(message.chat.id)
 
     logging.info("Scheduled successfully")
 
 
 @router.edited_message()
-async def any_edit_message(message: Message, db_session: AsyncSession):
-    if not await in_src(message.chat.id, db_session):
+async def any_edit_message(
+    message: Message, db_read_session: AsyncSession, edit_debouncer: EditDebouncer
+):
+    if not await in_src(message.chat.id, db_read_session):
         return
 
     logging.info(f"Editing existing message: {message.text=}")
 
-    message_cleared_str, links_str, file_id, media_type = extract_info(message)
-
-    scheduled_msg = await get_scheduled_message(
-        db_session, message.message_id, message.chat.id
+    message_cleared_str, message_links, file_id, media_type = extract_info(message)
+    content_hash = extract_fingerprint(message, message_cleared_str, message_links)
+
+    edit_debouncer.push(
+        message.chat.id,
+        message.message_id,
+        PendingEdit(
+            text=message_cleared_str,
+            links=message_links,
+            file_id=file_id,
+            media_type=media_type,
+            content_hash=content_hash,
+        ),
     )
-    scheduled_msg.text = message_cleared_str
-    scheduled_msg.links = links_str
-    scheduled_msg.file_id = file_id
-    scheduled_msg.media_type = media_type
-    # scheduled_msg.meta_info = message.model_dump_json(exclude_unset=True)
 
-    logging.info("Updated successfully")
+    logging.info("Edit is queued")
@@ -1,5 +1,6 @@
 import asyncio
 import logging
+from datetime import UTC, datetime
 
 from aiogram import Bot, Dispatcher
 from aiogram.client.default import DefaultBotProperties
@@ -7,24 +8,54 @@ from aiogram.client.session.aiohttp import AiohttpSession
 from aiogram.enums import ParseMode
 from aiogram.fsm.storage.memory import MemoryStorage
 
-from database.database_connector import get_db, DatabaseConnector, get_all_pairs
+from database.database_connector import (
+    get_db,
+    DatabaseConnector,
+    get_all_pairs,
+    get_last_sent_times,
+    PAIRS_CHANNEL,
+    QUEUE_CHANNEL,
+)
+from database.notify_listener import NotifyListener
 from middlewares.session_middleware import DBSessionMiddleware
 from middlewares.updates_dumper_middleware import UpdatesDumperMiddleware
 from resender_bot.commands import set_bot_commands
+from resender_bot.edit_debouncer import EditDebouncer
+from resender_bot.handlers.admin_handlers import router as admin_router
 from resender_bot.handlers.base_handlers import router as base_router
 from resender_bot.handlers.errors_handler import router as errors_router
 from resender_bot.logging_config import setup_logs
+from resender_bot.monitoring import MonitoringServer
 from resender_bot.notify_admin import on_shutdown_notify, on_startup_notify
-from resender_bot.sender_task import SenderTaskManager
+from resender_bot.retention import retention_task
+from resender_bot.retry import RetryPolicy
+from resender_bot.sender_task import SenderTaskManager, plan_start_delays
 from resender_bot.settings import Settings
+from resender_bot.shutdown import on_shutdown_drain
 
 
-async def recreate_tasks(task_manager: SenderTaskManager, db: DatabaseConnector):
-    async with db.session_factory.begin() as db_session:
+async def recreate_tasks(
+    task_manager: SenderTaskManager, db: DatabaseConnector, settings: Settings
+):
+    async with db.read_session_factory() as db_session:
         pairs = await get_all_pairs(db_session)
+        last_sent = await get_last_sent_times(db_session)
+
+    delays = plan_start_delays(
+        pairs,
+        last_sent,
+        datetime.now(UTC),
+        rate=settings.STARTUP_PAIRS_PER_SECOND,
+        jitter=settings.STARTUP_JITTER_SECONDS,
+    )
     for pair in pairs:
-        logging.debug(f"Adding pair {pair}")
-        task_manager.add_task(pair)
+        delay = delays[pair.private_chat_id]
+        logging.debug(f"Adding pair {pair}, first tick in {delay:.1f}s")
+        task_manager.add_task(pair.private_chat_id, start_delay=delay)
+    if delays:
+        logging.info(
+            f"Resuming {len(pairs)} pairs, all online in {max(delays.values()):.1f}s"
+        )
 
 
 async def main():
@@ -45,8 +76,40 @@ async def main():
     db = get_db(settings)
     await db.create_all()
 
-    task_manager = SenderTaskManager(db, bot, settings.ADMIN_ID)
-    dispatcher = Dispatcher(storage=storage, task_manager=task_manager, settings=settings)
+    task_manager = SenderTaskManager(
+        db,
+        bot,
+        settings.ADMIN_ID,
+        queue_wakeups=settings.QUEUE_WAKEUPS,
+        idle_poll_interval=settings.QUEUE_POLL_FALLBACK_SECONDS,
+        fan_out_rate=settings.FAN_OUT_RATE,
+        copy_native_posts=settings.COPY_NATIVE_POSTS,
+        retry_policy=RetryPolicy(
+            max_attempts=settings.RETRY_MAX_ATTEMPTS,
+            base_delay=settings.RETRY_BASE_DELAY_SECONDS,
+            max_delay=settings.RETRY_MAX_DELAY_SECONDS,
+        ),
+        breaker_threshold=settings.BREAKER_FAILURE_THRESHOLD,
+        breaker_probe_interval=settings.BREAKER_PROBE_INTERVAL_SECONDS,
+    )
+    # other processes (and this one) announce pair settings changes and new messages
+    notify_listener = NotifyListener(db.raw_dsn)
+    notify_listener.subscribe(PAIRS_CHANNEL, task_manager.invalidate_pair)
+    notify_listener.on_reconnect(task_manager.invalidate_all_pairs)
+    if settings.QUEUE_WAKEUPS:
+        notify_listener.subscribe(QUEUE_CHANNEL, task_manager.wake_pair)
+        notify_listener.on_reconnect(task_manager.wake_idle_pairs)
+    edit_debouncer = EditDebouncer(db, settings.EDIT_DEBOUNCE_SECONDS)
+    background_tasks: list[asyncio.Task] = []
+    dispatcher = Dispatcher(
+        storage=storage,
+        task_manager=task_manager,
+        edit_debouncer=edit_debouncer,
+        background_tasks=background_tasks,
+        notify_listener=notify_listener,
+        db=db,
+        settings=settings,
+    )
 
     db_session_middleware = DBSessionMiddleware(db)
     dispatcher.message.middleware(db_session_middleware)
@@ -54,14 +117,41 @@ async def main():
     dispatcher.callback_query.middleware(db_session_middleware)
     dispatcher.update.outer_middleware(UpdatesDumperMiddleware())
     dispatcher.startup.register(on_startup_notify)
+    monitoring = None
+    if settings.MONITORING_PORT is not None:
+        monitoring = MonitoringServer(
+            db, task_manager, settings.MONITORING_HOST, settings.MONITORING_PORT
+        )
+        # stops serving before on_shutdown_drain disposes the engines
+        dispatcher.shutdown.register(monitoring.stop)
+    # must run before on_shutdown_notify
+    dispatcher.shutdown.register(on_shutdown_drain)
     dispatcher.shutdown.register(on_shutdown_notify)
     dispatcher.startup.register(set_bot_commands)
     dispatcher.include_routers(
+        admin_router,
         base_router,
         errors_router,
     )
 
-    await recreate_tasks(task_manager, db)
+    notify_listener.start()
+    if monitoring is not None:
+        await monitoring.start()
+    await recreate_tasks(task_manager, db, settings)
+
+    background_tasks.append(
+        asyncio.create_task(
+            task_manager.supervise(
+                settings.SUPERVISOR_INTERVAL_SECONDS,
+                settings.SENDER_STALL_TIMEOUT_SECONDS,
+            ),
+            name='supervisor',
+        )
+    )
+    if settings.RETENTION_DAYS is not None:
+        background_tasks.append(
+            asyncio.create_task(retention_task(db, settings), name='retention')
+        )
 
     await dispatcher.start_polling(bot)
 
@@ -0,0 +1,40 @@
+from collections import Counter
+
+
+class TimingStats:
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def add(self, value: float):
+        self.count += 1
+        self.total += value
+        self.max = max(self.max, value)
+
+    def as_dict(self) -> dict:
+        avg = self.total / self.count if self.count else 0.0
+        return {'count': self.count, 'avg': avg, 'max': self.max, 'total': self.total}
+
+
+class Metrics:
+    """In-process counters and timings of the bot"""
+
+    def __init__(self):
+        self.counters: Counter[str] = Counter()
+        self.timings: dict[str, TimingStats] = {}
+
+    def inc(self, name: str, value: int = 1):
+        self.counters[name] += value
+
+    def observe(self, name: str, value: float):
+        self.timings.setdefault(name, TimingStats()).add(value)
+
+    def snapshot(self) -> dict:
+        return {
+            'counters': dict(self.counters),
+            'timings': {name: stats.as_dict() for name, stats in self.timings.items()},
+        }
+
+
+metrics = Metrics()
@@ -0,0 +1,86 @@
+import logging
+
+from aiohttp import web
+
+from database.database_connector import DatabaseConnector, get_all_pair_stats
+from resender_bot.metrics import metrics
+from resender_bot.sender_task import SenderTaskManager
+
+
+class MonitoringServer:
+    """Read-only json endpoint for dashboards and alerting.
+
+    Queue stats come from `pair_stats`, so a scrape costs one small query on the replica
+    """
+
+    def __init__(
+        self,
+        db: DatabaseConnector,
+        task_manager: SenderTaskManager,
+        host: str,
+        port: int,
+    ):
+        self.db = db
+        self.task_manager = task_manager
+        self.host = host
+        self.port = port
+        self.app = web.Application()
+        self.app.router.add_get('/metrics', self.metrics_handler)
+        self.app.router.add_get('/health', self.health_handler)
+        self.runner: web.AppRunner | None = None
+
+    async def collect(self) -> dict:
+        async with self.db.read_session_factory() as db_session:
+            pair_stats = await get_all_pair_stats(db_session)
+        return {
+            'metrics': metrics.snapshot(),
+            'pools': self.db.pool_stats(),
+            'pairs': {
+                str(stats.group_pair_id): {
+                    'queued': stats.queued,
+                    'sent': stats.sent,
+                    'error': stats.error,
+                    'last_sent_at': (
+                        stats.last_sent_at.isoformat()
+                        if stats.last_sent_at is not None
+                        else None
+                    ),
+                }
+                for stats in pair_stats
+            },
+        }
+
+    async def metrics_handler(self, request: web.Request) -> web.Response:
+        return web.json_response(await self.collect())
+
+    async def health_handler(self, request: web.Request) -> web.Response:
+        """Per-sender liveness, 503 if any sender is dead"""
+        senders = {
+            str(private_chat_id): health
+            for private_chat_id, health in self.task_manager.health_snapshot().items()
+        }
+        healthy = all(health['state'] != 'dead' for health in senders.values())
+        suspended_channels = {
+            str(chat_id): str(breaker)
+            for chat_id, breaker in self.task_manager.breakers.items()
+            if breaker.is_open
+        }
+        return web.json_response(
+            {
+                'healthy': healthy,
+                'senders': senders,
+                'suspended_channels': suspended_channels,
+            },
+            status=200 if healthy else 503,
+        )
+
+    async def start(self):
+        self.runner = web.AppRunner(self.app, access_log=None)
+        await self.runner.setup()
+        await web.TCPSite(self.runner, self.host, self.port).start()
+        logging.info(f"Monitoring on http://{self.host}:{self.port}/metrics")
+
+    async def stop(self):
+        if self.runner is not None:
+            await self.runner.cleanup()
+            self.runner = None
@@ -0,0 +1,97 @@
+import asyncio
+import cProfile
+import io
+import pstats
+import time
+from collections import Counter
+from datetime import UTC, datetime
+
+# functions broken down separately in the report: handlers, senders and link probes
+HOT_PATHS = r'handlers|_sender_task|_process_single_msg|get_link_info'
+TOP_FUNCTIONS = 40
+LAG_CHECK_INTERVAL = 0.05
+
+# held for the whole session, check `locked()` and enter it with no await in between
+lock = asyncio.Lock()
+
+
+def is_running() -> bool:
+    return lock.locked()
+
+
+def dump_tasks() -> str:
+    """All tasks of the loop, grouped by coroutine, with where each one is suspended"""
+    tasks = sorted(asyncio.all_tasks(), key=lambda t: t.get_coro().__qualname__)
+    counts = Counter(task.get_coro().__qualname__ for task in tasks)
+    lines = [f"{len(tasks)} tasks"]
+    lines += [f"  {count:5d}  {name}" for name, count in counts.most_common()]
+    lines.append("")
+    for task in tasks:
+        stack = task.get_stack(limit=1)
+        where = (
+            f"{stack[0].f_code.co_filename}:{stack[0].f_lineno}" if stack else "running"
+        )
+        lines.append(f"  {task.get_name()}  {task.get_coro().__qualname__}  at {where}")
+    return '\n'.join(lines)
+
+
+async def _measure_lag(lags: list[float]):
+    """How late the loop wakes up a sleeping coroutine, i.e. how long it was blocked"""
+    while True:
+        started = time.perf_counter()
+        await asyncio.sleep(LAG_CHECK_INTERVAL)
+        lags.append(time.perf_counter() - started - LAG_CHECK_INTERVAL)
+
+
+def format_lags(lags: list[float]) -> str:
+    if not lags:
+        return "no samples"
+    lags = sorted(lags)
+    p95 = lags[min(len(lags) - 1, int(len(lags) * 0.95))]
+    return (
+        f"samples: {len(lags)}, avg: {sum(lags) / len(lags) * 1000:.1f} ms,"
+        f" p95: {p95 * 1000:.1f} ms, max: {lags[-1] * 1000:.1f} ms"
+    )
+
+
+async def profile(seconds: float) -> str:
+    """Profiles the running process for `seconds` and returns a text report.
+
+    Nothing is hooked in between sessions, only one session runs at a time
+    """
+    if lock.locked():
+        raise RuntimeError("Profiling is already running")
+
+    async with lock:
+        return await run(seconds)
+
+
+async def run(seconds: float) -> str:
+    """Profiling session itself, the caller holds `lock`"""
+    tasks_before = dump_tasks()
+    lags: list[float] = []
+    lag_task = asyncio.create_task(_measure_lag(lags), name='profiler_lag')
+    profiler = cProfile.Profile()
+    started_at = datetime.now(UTC)
+    profiler.enable()
+    try:
+        await asyncio.sleep(seconds)
+    finally:
+        profiler.disable()
+        lag_task.cancel()
+        await asyncio.gather(lag_task, return_exceptions=True)
+    tasks_after = dump_tasks()
+
+    out = io.StringIO()
+    stats = pstats.Stats(profiler, stream=out)
+    out.write(f"Profile of {seconds}s started at {started_at}\n\n")
+    out.write(f"Event loop lag: {format_lags(lags)}\n\n")
+    out.write("=== Hot functions by own time ===\n")
+    stats.sort_stats(pstats.SortKey.TIME).print_stats(TOP_FUNCTIONS)
+    out.write("=== Hot functions by cumulative time ===\n")
+    stats.sort_stats(pstats.SortKey.CUMULATIVE).print_stats(TOP_FUNCTIONS)
+    out.write("=== Handlers, senders and link probes ===\n")
+    stats.sort_stats(pstats.SortKey.CUMULATIVE).print_stats(HOT_PATHS)
+    out.write(f"=== Tasks at start ===\n{tasks_before}\n\n")
+    out.write(f"=== Tasks at end ===\n{tasks_after}\n")
+    return out.getvalue()
@@ -0,0 +1,46 @@
+import asyncio
+import logging
+from datetime import UTC, datetime, timedelta
+
+from database.database_connector import DatabaseConnector, purge_finished_messages
+from resender_bot.metrics import metrics
+from resender_bot.settings import Settings
+
+# pause between batches, so retention never competes with senders for long
+BATCH_PAUSE_SECONDS = 0.1
+
+
+async def run_retention(
+    db: DatabaseConnector, max_age: timedelta, batch_size: int, archive: bool
+) -> int:
+    """Archives or deletes all messages finished more than `max_age` ago.
+
+    Each batch is a separate short transaction
+    """
+    cutoff = datetime.now(UTC) - max_age
+    total = 0
+    while True:
+        async with db.session_factory.begin() as session:
+            processed = await purge_finished_messages(
+                session, cutoff, batch_size, archive
+            )
+        total += processed
+        if processed < batch_size:
+            break
+        await asyncio.sleep(BATCH_PAUSE_SECONDS)
+
+    metrics.inc('retention_archived' if archive else 'retention_deleted', total)
+    return total
+
+
+async def retention_task(db: DatabaseConnector, settings: Settings):
+    max_age = timedelta(days=settings.RETENTION_DAYS)
+    while True:
+        try:
+            total = await run_retention(
+                db, max_age, settings.RETENTION_BATCH_SIZE, settings.RETENTION_ARCHIVE
+            )
+            logging.info(f"Retention processed {total} finished messages")
+        except Exception:
+            logging.exception("Retention failed:")
+        await asyncio.sleep(settings.RETENTION_INTERVAL_SECONDS)
@@ -0,0 +1,40 @@
+import random
+
+import aiohttp
+from aiogram.exceptions import (
+    TelegramNetworkError,
+    TelegramRetryAfter,
+    TelegramServerError,
+)
+from pydantic import BaseModel
+
+# worth another attempt later: flood control, network, Telegram 5xx, link probes
+TRANSIENT_ERRORS = (
+    TelegramRetryAfter,
+    TelegramNetworkError,
+    TelegramServerError,
+    aiohttp.ClientError,
+    TimeoutError,
+)
+
+
+def is_transient(exc: BaseException) -> bool:
+    return isinstance(exc, TRANSIENT_ERRORS)
+
+
+class RetryPolicy(BaseModel):
+    max_attempts: int = 5
+    base_delay: float = 30
+    max_delay: float = 3600
+
+    def delay(self, attempt: int, exc: BaseException | None = None) -> float:
+        """Seconds before the next attempt, `attempt` is the number of failed ones.
+
+        Exponential with jitter, so posts failed together don't retry together,
+        and never sooner than Telegram asked for
+        """
+        ceiling = min(self.max_delay, self.base_delay * 2 ** (attempt - 1))
+        delay = random.uniform(ceiling / 2, ceiling)
+        if isinstance(exc, TelegramRetryAfter):
+            delay = max(delay, exc.retry_after)
+        return delay
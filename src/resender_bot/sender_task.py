@@ -1,28 +1,41 @@
 import asyncio
 import logging
+import random
 import traceback
 from asyncio import Task
+from collections import Counter
+from datetime import UTC, datetime, timedelta
 
 import aiohttp
-from aiogram import Bot
-from aiogram.exceptions import TelegramAPIError
+from aiogram import Bot, html
+from aiogram.exceptions import TelegramAPIError, TelegramBadRequest
 from aiogram.types import (
     URLInputFile,
     InputMediaPhoto,
     InputMediaVideo,
     InputMediaAnimation,
+    Message,
 )
-from pydantic import BaseModel
+from pydantic import BaseModel, ConfigDict
+from sqlalchemy.exc import SQLAlchemyError
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm.attributes import flag_modified
 
 from database.database_connector import (
     GroupPair,
     DatabaseConnector,
     MessageStatusEnum,
+    SendOrderEnum,
+    get_next_attempt_at,
     get_next_msg,
     get_all_matching_media,
+    MessageLink,
     ScheduledMessage,
 )
+from resender_bot.circuit_breaker import CircuitBreaker, is_channel_error, probe_channel
+from resender_bot.metrics import metrics
+from resender_bot.rate_limiter import RateLimiter
+from resender_bot.retry import RetryPolicy, is_transient
 
 
 class LinkInfo(BaseModel):
@@ -31,151 +44,718 @@ class LinkInfo(BaseModel):
     size: int
 
 
+class PairSettings(BaseModel):
+    """In-memory copy of the GroupPair settings used by its sender"""
+
+    model_config = ConfigDict(from_attributes=True)
+
+    private_chat_id: int
+    public_chat_id: int
+    send_order: SendOrderEnum
+    interval: int
+    extra_chat_ids: list[int] = []
+
+
+class SenderHealth(BaseModel):
+    """Liveness of a sender, updated by the sender and checked by the supervisor"""
+
+    # the sender went through its loop
+    heartbeat_at: datetime | None = None
+    # the sender is inside a tick (db query, send, probes) since then
+    busy_since: datetime | None = None
+    last_success_at: datetime | None = None
+    restarts: int = 0
+    # restarts since the last successful send, drives the restart backoff
+    consecutive_restarts: int = 0
+
+
+class PairNotFoundError(RuntimeError):
+    pass
+
+
+# restarts of a dead or stalled sender are delayed exponentially up to the max
+RESTART_BASE_DELAY_SECONDS = 5
+RESTART_MAX_DELAY_SECONDS = 300
+# a sender doesn't know about retries scheduled before it started, it asks once
+RETRY_AT_UNKNOWN = datetime.min.replace(tzinfo=UTC)
+# how long a cancelled stalled sender may take to unwind before the restart is put off
+STALL_CANCEL_TIMEOUT_SECONDS = 5
+
 # 50 MB is a file size limit for bot
 TELEGRAM_FILE_SZ_LIMIT = 50 * 1024 * 1024
 
 
-async def get_link_info(link: str) -> LinkInfo:
-    async with aiohttp.ClientSession() as session:
-        async with session.get(link) as r:
-            mime, detail = r.content_type.split('/')
-            return LinkInfo(mime=mime, detail=detail, size=r.content_length)
+async def get_link_info(link: str, http_session: aiohttp.ClientSession) -> LinkInfo:
+    async with http_session.get(link) as r:
+        mime, detail = r.content_type.split('/')
+        return LinkInfo(mime=mime, detail=detail, size=r.content_length)
+
+
+async def resolve_link(
+    link: MessageLink, http_session: aiohttp.ClientSession
+) -> LinkInfo:
+    """Returns link info, probing the link only if it wasn't probed before"""
+    if link.mime is not None and link.size is not None:
+        mime, detail = link.mime.split('/')
+        return LinkInfo(mime=mime, detail=detail, size=link.size)
+
+    link_info = await get_link_info(link.url, http_session)
+    link.mime = f"{link_info.mime}/{link_info.detail}"
+    link.size = link_info.size
+    return link_info
+
+
+def link_to_input_media(
+    link: MessageLink, link_info: LinkInfo
+) -> InputMediaAnimation | InputMediaPhoto | InputMediaVideo | None:
+    media = link.file_id or URLInputFile(url=link.url)
+    if link_info.detail == 'gif':
+        return InputMediaAnimation(media=media)
+    if link_info.mime == 'image':
+        return InputMediaPhoto(media=media)
+    if link_info.mime == 'video':
+        return InputMediaVideo(media=media)
+    return None
+
+
+def sent_file_id(message: Message) -> str | None:
+    if message.photo:
+        return message.photo[-1].file_id
+    if message.animation:
+        return message.animation.file_id
+    if message.video:
+        return message.video.file_id
+    return None
+
+
+def remember_file_ids(media_links: list[MessageLink | None], sent_msgs: list[Message]):
+    """Caches file_ids of uploaded links, so they are never uploaded again"""
+    for link, sent in zip(media_links, sent_msgs):
+        if link is not None:
+            link.file_id = sent_file_id(sent)
+
+
+def is_native_post(msg: ScheduledMessage) -> bool:
+    """Posts of Telegram media and text only, they can be copied from the source group"""
+    return msg.message_id is not None and not msg.links and bool(msg.file_id or msg.text)
+
+
+def plan_start_delays(
+    pairs: list[GroupPair],
+    last_sent: dict[int, datetime],
+    now: datetime,
+    rate: float,
+    jitter: float,
+) -> dict[int, float]:
+    """Returns delay in seconds before the first tick of each pair.
+
+    A pair resumes one interval after its last send. Pairs are brought online in order
+    of their due time, at most `rate` per second, each with random jitter on top
+    """
+    due_in = {}
+    for pair in pairs:
+        pair_last_sent = last_sent.get(pair.private_chat_id)
+        if pair_last_sent is None:
+            due_in[pair.private_chat_id] = 0.0
+            continue
+        resume_at = pair_last_sent + timedelta(seconds=pair.interval)
+        due_in[pair.private_chat_id] = max(0.0, (resume_at - now).total_seconds())
+
+    delays = {}
+    previous_start = None
+    for private_chat_id in sorted(due_in, key=due_in.get):
+        start = due_in[private_chat_id]
+        if previous_start is not None:
+            start = max(start, previous_start + 1 / rate)
+        previous_start = start
+        delays[private_chat_id] = start + random.uniform(0, jitter)
+    return delays
 
 
 class SenderTaskManager:
-    def __init__(self, db: DatabaseConnector, bot: Bot, admin_id: int):
+    def __init__(
+        self,
+        db: DatabaseConnector,
+        bot: Bot,
+        admin_id: int,
+        queue_wakeups: bool = False,
+        idle_poll_interval: float = 300,
+        fan_out_rate: float = 20,
+        copy_native_posts: bool = False,
+        retry_policy: RetryPolicy | None = None,
+        breaker_threshold: int = 3,
+        breaker_probe_interval: float = 300,
+    ):
         self.tasks: dict[int, Task] = {}
+        self.fan_out_tasks: set[Task] = set()
+        self.health: dict[int, SenderHealth] = {}
         self.db = db
         self.bot = bot
         self.admin_id = admin_id
         self.events: dict[int, asyncio.Event] = {}
-
-    def add_task(self, private_chat_id: int):
-        if private_chat_id in self.tasks:
+        self.pairs: dict[int, PairSettings] = {}
+        # bumped on every change of a pair's settings, a load started under an older
+        # generation may have read a stale row and isn't cached
+        self.pair_generations: Counter[int] = Counter()
+        self.all_pairs_generation = 0
+        # with wakeups senders of empty queues sleep until `wake_pair`, without them
+        # they poll the queue every interval
+        self.queue_wakeups = queue_wakeups
+        # idle senders still look at their queue this often, in case a wakeup is lost
+        # (listener down, LISTEN not supported behind a transaction pooler)
+        self.idle_poll_interval = idle_poll_interval
+        # link-free posts are published with a single copy_messages call
+        self.copy_native_posts = copy_native_posts
+        self.retry_policy = retry_policy or RetryPolicy()
+        # earliest retry of each pair, an idle sender asks the database for the next
+        # one only after it's due, senders without retries don't ask at all
+        self.retry_at: dict[int, datetime] = {}
+        # per destination channel, main or extra, shared by pairs posting to it
+        self.breakers: dict[int, CircuitBreaker] = {}
+        self.breaker_threshold = breaker_threshold
+        self.breaker_probe_interval = breaker_probe_interval
+        self.idle: set[int] = set()
+        self.queued: set[int] = set()
+        self.stopping = False
+        # copies to extra channels of all pairs share this limit
+        self.fan_out_limiter = RateLimiter(fan_out_rate, burst=max(1, int(fan_out_rate)))
+        self._http_session: aiohttp.ClientSession | None = None
+
+    @property
+    def http_session(self) -> aiohttp.ClientSession:
+        """Session shared by all link probes"""
+        if self._http_session is None:
+            self._http_session = aiohttp.ClientSession()
+        return self._http_session
+
+    def add_task(self, private_chat_id: int, start_delay: float = 0) -> bool:
+        """Starts the sender of the pair, returns False if it wasn't started"""
+        if self.stopping:
+            logging.info(f"Shutting down, not starting task for {private_chat_id=}")
+            return False
+
+        task = self.tasks.get(private_chat_id)
+        if task is not None and not task.done():
             logging.info(f"Task for {private_chat_id=} is already registered, skipping ")
-            return
+            return False
 
+        self.events.setdefault(private_chat_id, asyncio.Event())
+        self.health.setdefault(private_chat_id, SenderHealth())
+        self.retry_at[private_chat_id] = RETRY_AT_UNKNOWN
         self.tasks[private_chat_id] = asyncio.create_task(
-            self._sender_task(private_chat_id),
+            self._sender_task(private_chat_id, start_delay),
             name=str(private_chat_id),
         )
-        self.events[private_chat_id] = asyncio.Event()
+        return True
+
+    def retire(self, private_chat_id: int):
+        """Forgets the pair, its sender stops on its own"""
+        self.tasks.pop(private_chat_id, None)
+        self.events.pop(private_chat_id, None)
+        self.health.pop(private_chat_id, None)
+        self.pairs.pop(private_chat_id, None)
+        self.retry_at.pop(private_chat_id, None)
+        self.idle.discard(private_chat_id)
+        self.queued.discard(private_chat_id)
+
+    def health_snapshot(self) -> dict[int, dict]:
+        now = datetime.now(UTC)
+        snapshot = {}
+        for private_chat_id, health in self.health.items():
+            task = self.tasks.get(private_chat_id)
+            if task is None or task.done():
+                state = 'dead'
+            elif health.busy_since is not None:
+                state = 'busy'
+            elif private_chat_id in self.idle:
+                state = 'idle'
+            else:
+                state = 'waiting'
+            snapshot[private_chat_id] = {
+                'state': state,
+                'busy_for': (
+                    (now - health.busy_since).total_seconds()
+                    if health.busy_since is not None
+                    else None
+                ),
+                **health.model_dump(mode='json'),
+            }
+        return snapshot
+
+    async def supervise(self, check_interval: float, stall_timeout: float):
+        """Restarts senders which died or are stuck inside a tick for too long"""
+        while not self.stopping:
+            await asyncio.sleep(check_interval)
+            await self.check_senders(stall_timeout)
+
+    async def check_senders(self, stall_timeout: float):
+        now = datetime.now(UTC)
+        for private_chat_id, task in list(self.tasks.items()):
+            if self.stopping:
+                return
+            health = self.health[private_chat_id]
+            if task.done():
+                exc = None if task.cancelled() else task.exception()
+                reason = f"died: {exc!r}"
+            elif (
+                health.busy_since is not None
+                and (now - health.busy_since).total_seconds() > stall_timeout
+            ):
+                reason = f"stalled since {health.busy_since}"
+                task.cancel()
+                done, _ = await asyncio.wait([task], timeout=STALL_CANCEL_TIMEOUT_SECONDS)
+                if not done:
+                    logging.warning(
+                        f"{private_chat_id=}: Stalled sender is still unwinding,"
+                        " restart is put off to the next check"
+                    )
+                    continue
+            else:
+                continue
+            if self.tasks.get(private_chat_id) is not task:
+                # retired or replaced meanwhile
+                continue
+
+            delay = min(
+                RESTART_MAX_DELAY_SECONDS,
+                RESTART_BASE_DELAY_SECONDS * 2**health.consecutive_restarts,
+            )
+            if not self.add_task(private_chat_id, start_delay=delay):
+                continue
+
+            health.busy_since = None
+            health.restarts += 1
+            health.consecutive_restarts += 1
+            err = f"{private_chat_id=}: Sender {reason}, restarting in {delay}s"
+            logging.warning(err)
+            metrics.inc('sender_restarts')
+            try:
+                await self.bot.send_message(self.admin_id, html.quote(err))
+            except TelegramAPIError:
+                logging.exception("Couldn't notify admin about the restart")
+
+    def _pair_generation(self, private_chat_id: int) -> tuple[int, int]:
+        return self.all_pairs_generation, self.pair_generations[private_chat_id]
+
+    def update_pair(self, group_pair: GroupPair):
+        self.pair_generations[group_pair.private_chat_id] += 1
+        self.pairs[group_pair.private_chat_id] = PairSettings.model_validate(group_pair)
 
     def update_interval(self, group_pair: GroupPair):
-        self.events[group_pair.private_chat_id].set()
+        self.update_pair(group_pair)
+        event = self.events.get(group_pair.private_chat_id)
+        if event is not None:
+            event.set()
+
+    def invalidate_pair(self, private_chat_id: int | str):
+        """Drops cached settings, the sender reloads them on its next tick"""
+        private_chat_id = int(private_chat_id)
+        self.pair_generations[private_chat_id] += 1
+        self.pairs.pop(private_chat_id, None)
+
+    def invalidate_all_pairs(self):
+        self.all_pairs_generation += 1
+        self.pairs.clear()
+
+    def wake_pair(self, private_chat_id: int | str):
+        """Called when a new message is queued for the pair"""
+        private_chat_id = int(private_chat_id)
+        if private_chat_id not in self.tasks:
+            return
+        self.queued.add(private_chat_id)
+        if private_chat_id in self.idle:
+            self.events[private_chat_id].set()
+
+    def wake_idle_pairs(self):
+        for private_chat_id in self.idle:
+            self.events[private_chat_id].set()
+
+    def breaker(self, chat_id: int) -> CircuitBreaker:
+        breaker = self.breakers.get(chat_id)
+        if breaker is None:
+            breaker = CircuitBreaker(self.breaker_threshold, self.breaker_probe_interval)
+            self.breakers[chat_id] = breaker
+        return breaker
+
+    async def _suspended_for(self, chat_id: int) -> float | None:
+        """Seconds to keep sends to the channel suspended, None if they may go on.
+
+        Probes the channel when its breaker is open and a probe is due
+        """
+        breaker = self.breakers.get(chat_id)
+        if breaker is None or not breaker.is_open:
+            return None
+        probe_in = breaker.probe_in()
+        if probe_in > 0:
+            return probe_in
+
+        if not await probe_channel(self.bot, chat_id):
+            breaker.probe_failed()
+            return breaker.probe_interval
+
+        if breaker.record_success():
+            await self._breaker_closed(chat_id)
+        return None
+
+    async def _breaker_closed(self, chat_id: int):
+        msg = f"{chat_id=}: Channel is reachable again, sends resumed"
+        logging.info(msg)
+        metrics.inc('breaker_closed')
+        await self.bot.send_message(self.admin_id, msg)
+
+    async def _get_pair(self, private_chat_id: int) -> PairSettings:
+        pair = self.pairs.get(private_chat_id)
+        if pair is not None:
+            return pair
+
+        generation = self._pair_generation(private_chat_id)
+        async with self.db.session_factory() as session:
+            group_pair = await session.get(GroupPair, private_chat_id)
+        if group_pair is None:
+            raise PairNotFoundError(
+                f"{private_chat_id=}: No group pair in the database for {private_chat_id=}, quiting this task"
+            )
+        pair = PairSettings.model_validate(group_pair)
+        # invalidated while loading: good enough for this tick, but not cached
+        if self._pair_generation(private_chat_id) == generation:
+            self.pairs[private_chat_id] = pair
+        return pair
+
+    async def shutdown(self, timeout: float):
+        """Stops scheduling new sends and waits for in-flight ones to be committed.
+
+        Senders still busy after `timeout` seconds are cancelled
+        """
+        self.stopping = True
+        for event in self.events.values():
+            event.set()
+
+        deadline = asyncio.get_running_loop().time() + timeout
+        await self._wait_or_cancel(list(self.tasks.values()), deadline, 'senders')
+        # started by the senders above, copies to extra channels
+        await self._wait_or_cancel(list(self.fan_out_tasks), deadline, 'fan outs')
+
+        if self._http_session is not None:
+            await self._http_session.close()
+
+    @staticmethod
+    async def _wait_or_cancel(tasks: list[Task], deadline: float, what: str):
+        if not tasks:
+            return
+        timeout = max(0.0, deadline - asyncio.get_running_loop().time())
+        _, pending = await asyncio.wait(tasks, timeout=timeout)
+        if pending:
+            logging.warning(f"{len(pending)} {what} didn't finish in time, cancelling")
+            for task in pending:
+                task.cancel()
+            await asyncio.gather(*pending, return_exceptions=True)
 
     async def _process_single_msg(self, private_chat_id: int):
         logging.debug(f"{private_chat_id=}: Getting next msg")
 
+        group_pair = await self._get_pair(private_chat_id)
+
+        # nothing is queried, probed or uploaded while the channel is failing
+        suspended_for = await self._suspended_for(group_pair.public_chat_id)
+        if suspended_for is not None:
+            logging.debug(f"{private_chat_id=}: Channel is suspended")
+            return suspended_for
+
+        sent_ids = []
         async with self.db.session_factory.begin() as session:
-            # noinspection PyTypeChecker
-            group_pair: GroupPair = await session.get(GroupPair, private_chat_id)
-            if group_pair is None:
-                raise RuntimeError(
-                    f"{private_chat_id=}: No group pair in the database for {private_chat_id=}, quiting this task"
-                )
-            next_msg = await get_next_msg(session, group_pair)
+            next_msg = await get_next_msg(session, private_chat_id, group_pair.send_order)
             logging.debug(f"{private_chat_id=}: Next msg is {next_msg}")
             if next_msg is None:
-                return group_pair.interval
+                return None
 
             logging.debug(f"{private_chat_id=}: Sending...")
 
             try:
-                await self._compose_and_send_msg(
+                sent_ids = await self._compose_and_send_msg(
                     private_chat_id, next_msg, session, group_pair
                 )
-            except TelegramAPIError:
-                err = f"{private_chat_id=}: Exception while trying to resend message:"
-                logging.exception(err)
-                next_msg.status = MessageStatusEnum.ERROR
-                await self.bot.send_message(self.admin_id, err)
-
-            try:
-                await self.bot.delete_message(next_msg.group_pair_id, next_msg.message_id)
-            except TelegramAPIError:
-                logging.exception(
-                    f"{private_chat_id=}: Exception while trying to delete message:"
+            except SQLAlchemyError:
+                raise
+            except Exception as e:
+                await self._handle_send_error(
+                    session, private_chat_id, next_msg, e, group_pair
                 )
 
+            # the source is kept while the message may be retried,
+            # bulk imported messages have no source message
+            if (
+                next_msg.status != MessageStatusEnum.NOT_SENT
+                and next_msg.message_id is not None
+            ):
+                try:
+                    await self.bot.delete_message(
+                        next_msg.group_pair_id, next_msg.message_id
+                    )
+                except TelegramAPIError:
+                    logging.exception(
+                        f"{private_chat_id=}: Exception while trying to delete message:"
+                    )
+
+        if next_msg.status == MessageStatusEnum.SENT:
+            breaker = self.breakers.get(group_pair.public_chat_id)
+            if breaker is not None and breaker.record_success():
+                await self._breaker_closed(group_pair.public_chat_id)
+            health = self.health.get(private_chat_id)
+            if health is not None:
+                health.last_success_at = datetime.now(UTC)
+                health.consecutive_restarts = 0
+
+        # after commit, a failed copy never publishes the post twice to the main channel
+        # and a slow or backing off extra channel doesn't hold up the pair
+        if sent_ids and group_pair.extra_chat_ids:
+            task = asyncio.create_task(
+                self._fan_out(group_pair, sent_ids), name=f"fan_out_{private_chat_id}"
+            )
+            self.fan_out_tasks.add(task)
+            task.add_done_callback(self.fan_out_tasks.discard)
+
         return group_pair.interval
 
-    async def _compose_and_send_msg(
+    async def _handle_send_error(
         self,
+        session: AsyncSession,
         private_chat_id: int,
         next_msg: ScheduledMessage,
-        session: AsyncSession,
-        group_pair: GroupPair,
+        exc: Exception,
+        group_pair: PairSettings,
     ):
-        sent_msg = None
+        """Schedules another attempt after a transient error, fails the message otherwise"""
+        # the post is fine, the channel isn't: keep it for when the channel is back
+        channel_error = is_channel_error(exc)
+        if channel_error and self.breaker(group_pair.public_chat_id).record_failure(exc):
+            await self._breaker_opened(group_pair.public_chat_id)
+
+        attempts = next_msg.attempts + 1
+        retry = (is_transient(exc) or channel_error) and (
+            attempts < self.retry_policy.max_attempts
+        )
+        next_attempt_at = None
+        if retry:
+            delay = self.retry_policy.delay(attempts, exc)
+            next_attempt_at = datetime.now(UTC) + timedelta(seconds=delay)
+            self.retry_at[private_chat_id] = min(
+                self.retry_at.get(private_chat_id, next_attempt_at), next_attempt_at
+            )
 
+        # an album is retried or failed as a whole
+        msgs = [next_msg]
+        if next_msg.media_group_id:
+            msgs = await get_all_matching_media(session, next_msg.media_group_id)
+        for msg in msgs:
+            if msg.status != MessageStatusEnum.NOT_SENT:
+                continue
+            msg.attempts = attempts
+            msg.last_error = f"{type(exc).__name__}: {exc}"
+            if retry:
+                msg.next_attempt_at = next_attempt_at
+            else:
+                msg.status = MessageStatusEnum.ERROR
+
+        if retry:
+            logging.warning(
+                f"{private_chat_id=}: Attempt {attempts} for {next_msg.id=} failed,"
+                f" next one at {next_attempt_at}: {exc!r}"
+            )
+            metrics.inc('send_retries')
+            return
+
+        err = f"{private_chat_id=}: Couldn't resend {next_msg.id=} ({attempts} attempts):"
+        logging.error(err, exc_info=exc)
+        metrics.inc('send_errors')
+        await self.bot.send_message(
+            self.admin_id, html.quote(f"{err} {type(exc).__name__}: {exc}")
+        )
+
+    async def _breaker_opened(self, chat_id: int):
+        breaker = self.breakers[chat_id]
+        msg = (
+            f"{chat_id=}: {breaker.failures} failures in a row ({breaker.last_error}),"
+            f" sends suspended, probing the channel every {breaker.probe_interval}s"
+        )
+        logging.warning(msg)
+        metrics.inc('breaker_opened')
+        await self.bot.send_message(self.admin_id, html.quote(msg))
+
+    async def _retry_in(self, private_chat_id: int) -> float | None:
+        """Seconds until a message of the pair backing off is due, None if there is none"""
+        retry_at = self.retry_at.get(private_chat_id)
+        if retry_at is None:
+            return None
+        if retry_at <= datetime.now(UTC):
+            # already taken by the tick (or unknown), later retries may be pending
+            async with self.db.session_factory() as session:
+                retry_at = await get_next_attempt_at(session, private_chat_id)
+            if retry_at is None:
+                self.retry_at.pop(private_chat_id, None)
+                return None
+            self.retry_at[private_chat_id] = retry_at
+        # at least a second, clocks of the bot and the database may disagree a bit
+        return max(1.0, (retry_at - datetime.now(UTC)).total_seconds())
+
+    async def _fan_out(self, group_pair: PairSettings, message_ids: list[int]):
+        """Copies a post published to the main channel to the extra channels.
+
+        Files are uploaded only once, copies reuse them
+        """
+        results = await asyncio.gather(
+            *(
+                self._copy_post_with_retry(
+                    chat_id, group_pair.public_chat_id, message_ids
+                )
+                for chat_id in group_pair.extra_chat_ids
+            ),
+            return_exceptions=True,
+        )
+        for chat_id, result in zip(group_pair.extra_chat_ids, results):
+            if isinstance(result, Exception):
+                logging.error(
+                    f"{group_pair.private_chat_id=}: Copy to {chat_id=} failed:",
+                    exc_info=result,
+                )
+
+    async def _copy_post_with_retry(
+        self, chat_id: int, from_chat_id: int, message_ids: list[int]
+    ):
+        """Copies a post to one extra channel, like sends to the main channel: transient
+        failures are retried with backoff, channel errors go to the channel's breaker
+        """
+        for attempt in range(1, self.retry_policy.max_attempts + 1):
+            if await self._suspended_for(chat_id) is not None:
+                logging.info(f"{chat_id=}: Channel is suspended, skipping the copy")
+                metrics.inc('fan_out_suspended')
+                return
+
+            try:
+                await self._copy_post(chat_id, from_chat_id, message_ids)
+            except TelegramAPIError as e:
+                if is_channel_error(e):
+                    logging.warning(f"{chat_id=}: Couldn't copy post: {e!r}")
+                    metrics.inc('fan_out_errors')
+                    if self.breaker(chat_id).record_failure(e):
+                        await self._breaker_opened(chat_id)
+                    return
+                if is_transient(e) and attempt < self.retry_policy.max_attempts:
+                    delay = self.retry_policy.delay(attempt, e)
+                    logging.warning(
+                        f"{chat_id=}: Copy attempt {attempt} failed, next in {delay:.0f}s:"
+                        f" {e!r}"
+                    )
+                    metrics.inc('fan_out_retries')
+                    await asyncio.sleep(delay)
+                    continue
+
+                err = f"{chat_id=}: Couldn't copy post from {from_chat_id=}: {e}"
+                logging.error(err)
+                metrics.inc('fan_out_errors')
+                await self.bot.send_message(self.admin_id, html.quote(err))
+                return
+
+            breaker = self.breakers.get(chat_id)
+            if breaker is not None and breaker.record_success():
+                await self._breaker_closed(chat_id)
+            return
+
+    async def _copy_post(self, chat_id: int, from_chat_id: int, message_ids: list[int]):
+        async with self.fan_out_limiter:
+            # a single call keeps albums together
+            await self.bot.copy_messages(chat_id, from_chat_id, message_ids)
+        metrics.inc('fan_out_copies')
+
+    async def _compose_and_send_msg(
+        self,
+        private_chat_id: int,
+        next_msg: ScheduledMessage,
+        session: AsyncSession,
+        group_pair: PairSettings,
+    ) -> list[int]:
+        """Publishes the message to the main channel, returns ids of the sent messages"""
+        msg_media_group = None
         if next_msg.media_group_id:
             # noinspection PyTypeChecker
             msg_media_group = await get_all_matching_media(
                 session, next_msg.media_group_id
             )
-            sent_msg = await self.send_group_media(msg_media_group, group_pair)
+
+        if self.copy_native_posts:
+            sent_ids = await self.copy_native_post(
+                next_msg, msg_media_group or [next_msg], group_pair
+            )
+            if sent_ids:
+                return sent_ids
+
+        sent_msgs = []
+        if msg_media_group is not None:
+            sent_msgs = await self.send_group_media(msg_media_group, group_pair)
         elif next_msg.file_id and next_msg.links:
-            sent_msg = await self.send_mixed_media(next_msg, group_pair)
+            sent_msgs = await self.send_mixed_media(next_msg, group_pair)
         elif next_msg.file_id:
-            sent_msg = await self.send_single_media(next_msg, group_pair)
+            sent_msgs = [await self.send_single_media(next_msg, group_pair)]
         elif next_msg.links:
-            splited_links = next_msg.links.split(';')
-            if len(splited_links) == 1:
-                link_info = await get_link_info(splited_links[0])
+            if len(next_msg.links) == 1:
+                link = next_msg.links[0]
+                link_info = await resolve_link(link, self.http_session)
+                flag_modified(next_msg, 'links')
 
                 if link_info.size > TELEGRAM_FILE_SZ_LIMIT:
                     logging.info(
-                        f"{next_msg.id=}: File size exceeded for link {splited_links[0]=}"
+                        f"{next_msg.id=}: File size exceeded for link {link.url=}"
                     )
                     next_msg.status = MessageStatusEnum.ERROR
-                    return
+                    return []
 
+                media = link.file_id or URLInputFile(url=link.url)
+                sent_msg = None
                 if link_info.mime == 'image' and link_info.detail == 'gif':
                     sent_msg = await self.bot.send_animation(
                         group_pair.public_chat_id,
-                        URLInputFile(url=splited_links[0]),
+                        media,
                         caption=next_msg.text,
                     )
                 elif link_info.mime == 'image':
                     # noinspection PyTypeChecker
                     sent_msg = await self.bot.send_photo(
                         group_pair.public_chat_id,
-                        URLInputFile(url=splited_links[0]),
+                        media,
                         caption=next_msg.text,
                     )
                 elif link_info.mime == 'video':
                     # noinspection PyTypeChecker
                     sent_msg = await self.bot.send_video(
                         group_pair.public_chat_id,
-                        URLInputFile(url=splited_links[0]),
+                        media,
                         caption=next_msg.text,
                         request_timeout=90,
                     )
+                if sent_msg is not None:
+                    remember_file_ids([link], [sent_msg])
+                    sent_msgs = [sent_msg]
             else:
                 media_list = []
-                for link in splited_links:
-                    link_info = await get_link_info(link)
+                media_links = []
+                for link in next_msg.links:
+                    link_info = await resolve_link(link, self.http_session)
 
                     if link_info.size > TELEGRAM_FILE_SZ_LIMIT:
                         logging.info(
-                            f"{next_msg.id=}: File size exceeded for link {link=}"
+                            f"{next_msg.id=}: File size exceeded for link {link.url=}"
                         )
                         continue
 
-                    if link_info.detail == 'gif':
-                        single_media = InputMediaAnimation(media=URLInputFile(url=link))
-                    elif link_info.mime == 'image':
-                        single_media = InputMediaPhoto(media=URLInputFile(url=link))
-                    elif link_info.mime == 'video':
-                        single_media = InputMediaVideo(media=URLInputFile(url=link))
-                    else:
+                    single_media = link_to_input_media(link, link_info)
+                    if single_media is None:
                         raise RuntimeError(f"{next_msg.id=}: Unexpected mime type")
                     media_list.append(single_media)
+                    media_links.append(link)
+                flag_modified(next_msg, 'links')
                 if len(media_list) == 0:
                     logging.warning(f"{next_msg.id=}: Couldn't send any files, skipping")
                     next_msg.status = MessageStatusEnum.ERROR
-                    return
+                    return []
 
                 media_list[0].caption = next_msg.text
                 sent_msgs = await self.bot.send_media_group(
@@ -183,7 +763,7 @@ class SenderTaskManager:
                     media=media_list,
                     request_timeout=90,
                 )
-                sent_msg = sent_msgs[0]
+                remember_file_ids(media_links, sent_msgs)
         elif next_msg.text:
             # noinspection PyTypeChecker
             sent_msg = await self.bot.send_message(
@@ -191,9 +771,10 @@ class SenderTaskManager:
                 text=next_msg.text,
                 request_timeout=20,
             )
+            sent_msgs = [sent_msg]
 
-        if sent_msg is not None:
-            logging.debug(f"{private_chat_id=}: {sent_msg=}")
+        if sent_msgs:
+            logging.debug(f"{private_chat_id=}: {sent_msgs=}")
         else:
             err = (
                 f"{private_chat_id=}: Sent msg for {next_msg.id=} is None for some reason"
@@ -202,16 +783,46 @@ class SenderTaskManager:
             await self.bot.send_message(self.admin_id, err)
 
         next_msg.status = MessageStatusEnum.SENT
+        return [sent.message_id for sent in sent_msgs]
 
-    async def _sender_task(self, private_chat_id: int):
-        while True:
+    async def _sender_task(self, private_chat_id: int, start_delay: float = 0):
+        if start_delay > 0:
+            try:
+                await asyncio.wait_for(
+                    self.events[private_chat_id].wait(), timeout=start_delay
+                )
+            except TimeoutError:
+                pass
+
+        health = self.health[private_chat_id]
+        while not self.stopping:
             try:
                 event = self.events[private_chat_id]
                 event.clear()
-                timeout = await self._process_single_msg(private_chat_id)
+                self.queued.discard(private_chat_id)
+                health.heartbeat_at = health.busy_since = datetime.now(UTC)
+                try:
+                    timeout = await self._process_single_msg(private_chat_id)
+                finally:
+                    health.busy_since = None
+                if timeout is None:
+                    if private_chat_id in self.queued:
+                        # a message was queued while we were looking
+                        continue
+                    self.idle.add(private_chat_id)
+                    timeout = await self._retry_in(private_chat_id)
+                    if self.queue_wakeups:
+                        poll = self.idle_poll_interval
+                    else:
+                        poll = (await self._get_pair(private_chat_id)).interval
+                    timeout = poll if timeout is None else min(timeout, poll)
                 await asyncio.wait_for(event.wait(), timeout=timeout)
             except TimeoutError:
                 pass
+            except PairNotFoundError:
+                logging.info(f"{private_chat_id=}: Pair was deregistered, retiring")
+                self.retire(private_chat_id)
+                return
             except Exception as e:
                 logging.exception("Unexpected thing happened:")
 
@@ -226,8 +837,54 @@ class SenderTaskManager:
                 )
 
                 await self.bot.send_message(self.admin_id, error_message)
+            finally:
+                self.idle.discard(private_chat_id)
+
+    async def copy_native_post(
+        self,
+        next_msg: ScheduledMessage,
+        msgs: list[ScheduledMessage],
+        group_pair: PairSettings,
+    ) -> list[int]:
+        """Copies the post (a whole album at once) from the source group as is.
+
+        Returns an empty list if the post has links or can't be copied (source messages
+        are gone, protected content), then it is composed from the stored file_ids instead
+        """
+        if not all(is_native_post(msg) for msg in msgs):
+            return []
+
+        try:
+            sent = await self.bot.copy_messages(
+                group_pair.public_chat_id,
+                group_pair.private_chat_id,
+                sorted(msg.message_id for msg in msgs),
+            )
+        except TelegramBadRequest as e:
+            # protected content, source deleted in the meantime, ...
+            logging.info(f"{next_msg.id=}: Can't copy ({e}), composing instead")
+            return []
+        if not sent:
+            logging.info(f"{next_msg.id=}: Source messages are gone, composing instead")
+            return []
+        metrics.inc('native_copies')
+
+        next_msg.status = MessageStatusEnum.SENT
+        # the rest of the album, next_msg source is deleted as in other cases
+        for msg in msgs:
+            if msg is next_msg:
+                continue
+            msg.status = MessageStatusEnum.SENT
+            try:
+                await self.bot.delete_message(msg.group_pair_id, msg.message_id)
+            except TelegramAPIError:
+                pass
 
-    async def send_single_media(self, next_msg: ScheduledMessage, group_pair: GroupPair):
+        return [message.message_id for message in sent]
+
+    async def send_single_media(
+        self, next_msg: ScheduledMessage, group_pair: PairSettings
+    ):
         if next_msg.media_type == 'PHOTO':
             # noinspection PyTypeChecker
             sent_msg = await self.bot.send_photo(
@@ -258,9 +915,10 @@ class SenderTaskManager:
         return sent_msg
 
     async def send_group_media(
-        self, msg_media_group: list[ScheduledMessage], group_pair: GroupPair
-    ):
+        self, msg_media_group: list[ScheduledMessage], group_pair: PairSettings
+    ) -> list[Message]:
         media_list = []
+        media_links = []
         for msg in msg_media_group:
             if msg.media_type == 'PHOTO':
                 single_media = InputMediaPhoto(media=msg.file_id)
@@ -273,65 +931,64 @@ class SenderTaskManager:
             if msg.text:
                 single_media.caption = msg.text
             media_list.append(single_media)
+            media_links.append(None)
 
         for msg in msg_media_group:
             if not msg.links:
                 continue
-            splited_links = msg.links.split(';')
-            for link in splited_links:
-                link_info = await get_link_info(link)
+            for link in msg.links:
+                link_info = await resolve_link(link, self.http_session)
 
                 if link_info.size > TELEGRAM_FILE_SZ_LIMIT:
-                    logging.warning(f"{msg.id=}: Skipping link, file too big: {link}")
+                    logging.warning(f"{msg.id=}: Skipping link, file too big: {link.url}")
                     continue
 
-                if link_info.detail == 'gif':
-                    single_media = InputMediaAnimation(media=URLInputFile(url=link))
-                elif link_info.mime == 'image':
-                    single_media = InputMediaPhoto(media=URLInputFile(url=link))
-                elif link_info.mime == 'video':
-                    single_media = InputMediaVideo(media=URLInputFile(url=link))
-                else:
+                single_media = link_to_input_media(link, link_info)
+                if single_media is None:
                     raise RuntimeError(f"{msg.id=}: Unexpected mime type")
                 media_list.append(single_media)
+                media_links.append(link)
+            flag_modified(msg, 'links')
 
         media_list = media_list[:10]
 
         sent_msgs = await self.bot.send_media_group(
             group_pair.public_chat_id, media=media_list
         )
+        remember_file_ids(media_links, sent_msgs)
 
         # early delete and mark as sent for all except first, which will be handled
         # as in other cases
         for msg in msg_media_group[1:]:
             msg.status = MessageStatusEnum.SENT
+            if msg.message_id is None:
+                continue
 
             try:
                 await self.bot.delete_message(msg.group_pair_id, msg.message_id)
             except TelegramAPIError:
                 pass
 
-        return sent_msgs[0]
+        return sent_msgs
 
-    async def send_mixed_media(self, msg: ScheduledMessage, group_pair: GroupPair):
+    async def send_mixed_media(
+        self, msg: ScheduledMessage, group_pair: PairSettings
+    ) -> list[Message]:
         media_list = []
-        splited_links = msg.links.split(';')
-        for link in splited_links:
-            link_info = await get_link_info(link)
+        media_links = []
+        for link in msg.links:
+            link_info = await resolve_link(link, self.http_session)
 
             if link_info.size > TELEGRAM_FILE_SZ_LIMIT:
-                logging.warning(f"{msg.id=} file size limit exceeded: {link}")
+                logging.warning(f"{msg.id=} file size limit exceeded: {link.url}")
                 continue
 
-            if link_info.detail == 'gif':
-                single_media = InputMediaAnimation(media=URLInputFile(url=link))
-            elif link_info.mime == 'image':
-                single_media = InputMediaPhoto(media=URLInputFile(url=link))
-            elif link_info.mime == 'video':
-                single_media = InputMediaVideo(media=URLInputFile(url=link))
-            else:
+            single_media = link_to_input_media(link, link_info)
+            if single_media is None:
                 raise RuntimeError(f"{msg.id=}: Unexpected mime type")
             media_list.append(single_media)
+            media_links.append(link)
+        flag_modified(msg, 'links')
 
         if msg.media_type == 'PHOTO':
             single_media = InputMediaPhoto(media=msg.file_id)
@@ -343,10 +1000,12 @@ class SenderTaskManager:
             raise RuntimeError(f"{msg.id=}: Unexpected media type")
 
         media_list.append(single_media)
+        media_links.append(None)
         media_list[0].caption = msg.text
         media_list = media_list[:10]
 
         sent_msgs = await self.bot.send_media_group(
             group_pair.public_chat_id, media=media_list, request_timeout=90
         )
-        return sent_msgs[0]
+        remember_file_ids(media_links, sent_msgs)
+        return sent_msgs
@@ -1,4 +1,4 @@
-from pydantic import SecretStr
+from pydantic import Field, SecretStr
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
 
@@ -6,6 +6,56 @@ class Settings(BaseSettings):
     BOT_TOKEN: SecretStr
     ADMIN_ID: int
     DB_URL: SecretStr
+    # optional read replica for read-heavy paths, primary is used when not set
+    DB_REPLICA_URL: SecretStr | None = None
+    DB_POOL_SIZE: int = 5
+    DB_MAX_OVERFLOW: int = 10
+    DB_POOL_TIMEOUT: float = 30
+    DB_POOL_RECYCLE: int = -1
+    DB_POOL_PRE_PING: bool = False
+    # size of asyncpg prepared statements cache per connection, 0 disables it (pgbouncer)
+    DB_STATEMENT_CACHE_SIZE: int = 100
+    # postgres runtime parameters for each connection, json in env
+    DB_SERVER_SETTINGS: dict[str, str] = {}
+    # edits of the same message coming within this delay are written only once
+    EDIT_DEBOUNCE_SECONDS: float = 1.0
+    # finished messages older than this are archived (or deleted), None disables retention
+    RETENTION_DAYS: int | None = None
+    RETENTION_ARCHIVE: bool = True
+    RETENTION_BATCH_SIZE: int = 500
+    RETENTION_INTERVAL_SECONDS: int = 3600
+    # senders are brought online at this rate after a restart, plus random jitter
+    STARTUP_PAIRS_PER_SECOND: float = Field(5, gt=0)
+    STARTUP_JITTER_SECONDS: float = 10
+    # how long shutdown waits for in-flight sends before cancelling them
+    SHUTDOWN_TIMEOUT_SECONDS: float = 30
+    # wake idle senders with LISTEN/NOTIFY instead of polling empty queues every interval
+    QUEUE_WAKEUPS: bool = True
+    # with wakeups, idle senders still poll their queue this often as a fallback
+    QUEUE_POLL_FALLBACK_SECONDS: float = 300
+    # posts already queued, or sent to the same channel within this window, are skipped;
+    # None disables deduplication
+    DEDUP_WINDOW_HOURS: float | None = 24
+    # copies to extra target channels, per second across all pairs
+    FAN_OUT_RATE: float = Field(20, gt=0)
+    # publish posts without links by copying them from the source group, instead of
+    # sending stored file_ids again
+    COPY_NATIVE_POSTS: bool = False
+    # transient send failures (timeouts, flood control, 5xx) are retried with backoff
+    RETRY_MAX_ATTEMPTS: int = 5
+    RETRY_BASE_DELAY_SECONDS: float = 30
+    RETRY_MAX_DELAY_SECONDS: float = 3600
+    # sends to a channel are suspended after this many failures of the same kind in a
+    # row (bot lost admin rights, channel deleted), the channel is probed until it's back
+    BREAKER_FAILURE_THRESHOLD: int = 3
+    BREAKER_PROBE_INTERVAL_SECONDS: float = 300
+    # senders are checked this often, dead ones and ones busy with a single tick
+    # for longer than the stall timeout are restarted
+    SUPERVISOR_INTERVAL_SECONDS: float = 30
+    SENDER_STALL_TIMEOUT_SECONDS: float = 600
+    # serve metrics, pool and queue stats as json on this port, None disables it
+    MONITORING_PORT: int | None = None
+    MONITORING_HOST: str = '127.0.0.1'
 
     model_config = SettingsConfigDict(
         env_file='.env',
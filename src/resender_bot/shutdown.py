@@ -0,0 +1,37 @@
+import asyncio
+import logging
+
+from database.database_connector import DatabaseConnector
+from database.notify_listener import NotifyListener
+from resender_bot.edit_debouncer import EditDebouncer
+from resender_bot.metrics import metrics
+from resender_bot.sender_task import SenderTaskManager
+from resender_bot.settings import Settings
+
+
+async def on_shutdown_drain(
+    task_manager: SenderTaskManager,
+    edit_debouncer: EditDebouncer,
+    background_tasks: list[asyncio.Task],
+    notify_listener: NotifyListener,
+    db: DatabaseConnector,
+    settings: Settings,
+):
+    """Lets in-flight sends commit before the process exits.
+
+    Otherwise a post accepted by Telegram but not yet marked as SENT is published
+    again after restart
+    """
+    logging.info("Draining senders...")
+    await task_manager.shutdown(timeout=settings.SHUTDOWN_TIMEOUT_SECONDS)
+
+    for task in background_tasks:
+        task.cancel()
+    await asyncio.gather(*background_tasks, return_exceptions=True)
+    await notify_listener.stop()
+
+    await edit_debouncer.flush_all()
+    logging.info(f"Final metrics: {metrics.snapshot()}")
+
+    await db.dispose()
+    logging.info("Drained")
@@ -0,0 +1,142 @@
+import json
+from datetime import UTC, datetime, timedelta
+
+import pytest
+from aiogram.types import Chat, Message, PhotoSize
+from sqlalchemy import select, text
+
+from database.database_connector import (
+    GroupPair,
+    MessageStatusEnum,
+    ScheduledMessage,
+    SchemaOutdatedError,
+)
+from database.migrations import apply_migrations
+from resender_bot.bulk_import import bulk_import
+from resender_bot.handlers.base_handlers import extract_fingerprint
+
+
+async def register_pair(db):
+    async with db.session_factory.begin() as session:
+        session.add(GroupPair(private_chat_id=100, public_chat_id=200))
+
+
+async def queued_messages(db) -> list[ScheduledMessage]:
+    async with db.session_factory() as session:
+        result = await session.execute(
+            select(ScheduledMessage).order_by(ScheduledMessage.created_at)
+        )
+        return list(result.scalars())
+
+
+@pytest.mark.asyncio
+async def test_jsonl_import(db, tmp_path):
+    await register_pair(db)
+    rows = [
+        {"text": "first", "links": ["https://a.com/1;2.png"]},
+        {"file_id": "AgAC", "media_type": "PHOTO", "media_group_id": "1"},
+        {"text": "first", "links": ["https://a.com/1;2.png"]},
+        {"file_id": "AgAC"},
+        {"text": "caption", "media_group_id": "1"},
+        {},
+    ]
+    path = tmp_path / 'posts.jsonl'
+    path.write_text('\n'.join(json.dumps(row) for row in rows) + '\nnot json\n')
+
+    stats = await bulk_import(db, 100, path)
+
+    assert (stats.imported, stats.invalid, stats.duplicates) == (2, 4, 1)
+    first, second = await queued_messages(db)
+    assert first.text == "first"
+    assert first.links[0].url == "https://a.com/1;2.png"
+    assert first.status == MessageStatusEnum.NOT_SENT
+    assert first.message_id is None
+    assert first.content_hash is not None
+    assert second.media_group_id.endswith("-1")
+
+
+@pytest.mark.asyncio
+async def test_csv_import(db, tmp_path):
+    await register_pair(db)
+    path = tmp_path / 'posts.csv'
+    path.write_text(
+        "text,links,file_id,media_type\n"
+        "hello,https://a.com/1.png https://a.com/2.png,,\n"
+        ",,BAAC,VIDEO\n"
+    )
+
+    stats = await bulk_import(db, 100, path)
+
+    assert stats.imported == 2
+    first, second = await queued_messages(db)
+    assert [link.url for link in first.links] == [
+        "https://a.com/1.png",
+        "https://a.com/2.png",
+    ]
+    assert second.media_type == "VIDEO"
+
+
+@pytest.mark.asyncio
+async def test_import_requires_registered_pair(db, tmp_path):
+    path = tmp_path / 'posts.jsonl'
+    path.write_text('{"text": "hello"}\n')
+
+    with pytest.raises(ValueError):
+        await bulk_import(db, 100, path)
+
+
+@pytest.mark.asyncio
+async def test_import_skips_posts_known_to_the_channel(db, tmp_path):
+    await register_pair(db)
+    live = Message(
+        message_id=1,
+        date=datetime.now(UTC),
+        chat=Chat(id=100, type='supergroup'),
+        photo=[PhotoSize(file_id='live-file-id', file_unique_id='u1', width=1, height=1)],
+        caption='hello',
+    )
+    async with db.session_factory.begin() as session:
+        session.add(
+            ScheduledMessage(
+                message_id=1,
+                group_pair_id=100,
+                meta_info="empty",
+                content_hash=extract_fingerprint(live, 'hello', None),
+            )
+        )
+    rows = [
+        # the same photo as the live post, seen by the importing bot under another file_id
+        {"text": "hello", "file_id": "x", "file_unique_id": "u1", "media_type": "PHOTO"},
+        {"text": "hello", "file_id": "y", "file_unique_id": "u2", "media_type": "PHOTO"},
+        {"text": "hello", "file_id": "z", "media_type": "PHOTO"},
+        {"text": "hello", "file_id": "z", "media_type": "PHOTO"},
+    ]
+    path = tmp_path / 'posts.jsonl'
+    path.write_text('\n'.join(json.dumps(row) for row in rows))
+
+    stats = await bulk_import(db, 100, path, dedup_window=timedelta(hours=24))
+
+    assert (stats.imported, stats.duplicates) == (3, 1)
+
+
+@pytest.mark.asyncio
+async def test_outdated_schema_is_detected(db):
+    await db.check_schema()
+
+    async with db.engine.begin() as conn:
+        await conn.execute(
+            text("ALTER TABLE scheduled_messages DROP COLUMN content_hash")
+        )
+        await conn.execute(
+            text("ALTER TABLE scheduled_messages ALTER COLUMN message_id SET NOT NULL")
+        )
+
+    with pytest.raises(SchemaOutdatedError) as exc_info:
+        await db.check_schema()
+    assert "no column scheduled_messages.content_hash" in str(exc_info.value)
+    assert "scheduled_messages.message_id is NOT NULL" in str(exc_info.value)
+
+    # the bot migrates it on start
+    async with db.engine.begin() as conn:
+        await apply_migrations(conn)
+    await db.check_schema()
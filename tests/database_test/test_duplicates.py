@@ -0,0 +1,97 @@
+from datetime import UTC, datetime, timedelta
+
+import pytest
+from aiogram.types import Chat, Message, PhotoSize
+from sqlalchemy import select
+
+from database.database_connector import (
+    GroupPair,
+    MessageStatusEnum,
+    ScheduledMessage,
+    find_duplicate,
+)
+from resender_bot.handlers.base_handlers import any_message
+from resender_bot.settings import Settings
+
+
+@pytest.mark.asyncio
+async def test_find_duplicate(db):
+    now = datetime.now(UTC)
+    async with db.session_factory.begin() as session:
+        session.add(GroupPair(private_chat_id=100, public_chat_id=200))
+        session.add(GroupPair(private_chat_id=101, public_chat_id=200))
+        session.add(GroupPair(private_chat_id=102, public_chat_id=300))
+        queued = ScheduledMessage(
+            message_id=1, group_pair_id=100, meta_info="empty", content_hash="queued"
+        )
+        session.add(queued)
+        for content_hash, finished_at in (
+            ("recent", now),
+            ("old", now - timedelta(days=2)),
+        ):
+            msg = ScheduledMessage(
+                message_id=2,
+                group_pair_id=100,
+                meta_info="empty",
+                content_hash=content_hash,
+            )
+            msg.status = MessageStatusEnum.SENT
+            msg.finished_at = finished_at
+            session.add(msg)
+
+    sent_after = now - timedelta(days=1)
+    async with db.session_factory() as session:
+        # another source group of the same channel
+        assert await find_duplicate(session, "queued", 200, sent_after) == queued.id
+        assert await find_duplicate(session, "recent", 200, sent_after) is not None
+        assert await find_duplicate(session, "old", 200, sent_after) is None
+        # another channel
+        assert await find_duplicate(session, "queued", 300, sent_after) is None
+
+
+class FakeBot:
+    def __init__(self):
+        self.deleted = []
+
+    async def delete_message(self, chat_id, message_id):
+        self.deleted.append((chat_id, message_id))
+
+
+class NoWakeups:
+    def wake_pair(self, private_chat_id):
+        pass
+
+
+def photo_message(message_id: int, media_group_id: str | None = None) -> Message:
+    return Message(
+        message_id=message_id,
+        date=datetime.now(UTC),
+        chat=Chat(id=100, type='supergroup'),
+        photo=[PhotoSize(file_id='f', file_unique_id='u', width=1, height=1)],
+        media_group_id=media_group_id,
+    )
+
+
+@pytest.mark.asyncio
+async def test_duplicates_are_skipped_except_inside_albums(db):
+    async with db.session_factory.begin() as session:
+        session.add(GroupPair(private_chat_id=100, public_chat_id=200))
+    settings = Settings.model_construct(DEDUP_WINDOW_HOURS=24, QUEUE_WAKEUPS=False)
+    bot = FakeBot()
+
+    for message in (photo_message(1), photo_message(2), photo_message(3, 'album')):
+        async with (
+            db.session_factory() as db_session,
+            db.read_session_factory() as db_read_session,
+        ):
+            await any_message(
+                message, bot, db_session, db_read_session, settings, NoWakeups()
+            )
+
+    async with db.session_factory() as session:
+        queued = await session.scalars(
+            select(ScheduledMessage.message_id).order_by(ScheduledMessage.message_id)
+        )
+        assert list(queued) == [1, 3]
+    # the skipped duplicate is cleaned up from the source group
+    assert bot.deleted == [(100, 2)]
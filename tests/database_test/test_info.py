@@ -0,0 +1,42 @@
+from types import SimpleNamespace
+
+import pytest
+from aiogram.exceptions import TelegramForbiddenError
+from aiogram.methods import CopyMessages
+
+from database.database_connector import GroupPair
+from resender_bot.handlers.base_handlers import info_handler
+from resender_bot.sender_task import SenderTaskManager
+
+
+class FakeMessage:
+    def __init__(self, chat_id: int):
+        self.chat = SimpleNamespace(id=chat_id)
+        self.answers = []
+
+    async def answer(self, text):
+        self.answers.append(text)
+
+
+@pytest.mark.asyncio
+async def test_info_shows_state_of_every_destination(db):
+    async with db.session_factory.begin() as session:
+        session.add(
+            GroupPair(private_chat_id=100, public_chat_id=200, extra_chat_ids=[300, 400])
+        )
+    task_manager = SenderTaskManager(db, bot=None, admin_id=1, breaker_threshold=1)
+    task_manager.breaker(400).record_failure(
+        TelegramForbiddenError(
+            CopyMessages(chat_id=400, from_chat_id=200, message_ids=[1]),
+            "bot was kicked",
+        )
+    )
+    message = FakeMessage(100)
+
+    async with db.read_session_factory() as db_read_session:
+        await info_handler(message, db_read_session, task_manager)
+
+    (text,) = message.answers
+    assert "Channel state: ok" in text
+    assert "300 (ok)" in text
+    assert "400 (suspended since" in text
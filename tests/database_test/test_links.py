@@ -0,0 +1,48 @@
+import pytest
+from sqlalchemy import text
+
+from database.database_connector import MessageLink, ScheduledMessage
+
+
+@pytest.mark.asyncio
+async def test_links_roundtrip(db):
+    async with db.session_factory.begin() as session:
+        msg = ScheduledMessage(
+            message_id=1,
+            group_pair_id=100,
+            links=[MessageLink(url='https://example.com/a;b.png')],
+            meta_info="empty",
+        )
+        session.add(msg)
+
+    async with db.session_factory.begin() as session:
+        msg = await session.get(ScheduledMessage, msg.id)
+        assert msg.links == [MessageLink(url='https://example.com/a;b.png')]
+
+
+@pytest.mark.asyncio
+async def test_legacy_links_are_migrated(db):
+    async with db.engine.begin() as conn:
+        await conn.execute(
+            text(
+                "ALTER TABLE scheduled_messages ALTER COLUMN links TYPE varchar USING NULL"
+            )
+        )
+        await conn.execute(
+            text(
+                "INSERT INTO scheduled_messages "
+                "(message_id, group_pair_id, status, links, meta_info, created_at) "
+                "VALUES (1, 100, 'NOT_SENT', 'https://a.com/1.png;https://b.com/2.mp4', "
+                "'empty', now())"
+            )
+        )
+
+    await db.create_all()
+
+    async with db.session_factory.begin() as session:
+        msg = await session.get(ScheduledMessage, 1)
+        assert [link.url for link in msg.links] == [
+            'https://a.com/1.png',
+            'https://b.com/2.mp4',
+        ]
+        assert msg.links[0].mime is None
@@ -0,0 +1,94 @@
+from datetime import UTC, datetime, timedelta
+
+import pytest
+from sqlalchemy import delete, insert, update
+
+from database.database_connector import (
+    MessageStatusEnum,
+    PairStats,
+    ScheduledMessage,
+    get_last_sent_times,
+)
+from resender_bot.retention import run_retention
+
+
+async def get_stats(db, group_pair_id: int) -> tuple:
+    async with db.session_factory() as session:
+        stats = await session.get(PairStats, group_pair_id)
+        return stats.queued, stats.sent, stats.error
+
+
+@pytest.mark.asyncio
+async def test_pair_stats_follow_queue(db):
+    async with db.session_factory.begin() as session:
+        await session.execute(
+            insert(ScheduledMessage.__table__),
+            [
+                {'message_id': i, 'group_pair_id': group, 'meta_info': 'empty'}
+                for group in (100, 101)
+                for i in range(5)
+            ],
+        )
+    assert await get_stats(db, 100) == (5, 0, 0)
+
+    async with db.session_factory.begin() as session:
+        messages = await session.scalars(
+            ScheduledMessage.__table__.select()
+            .with_only_columns(ScheduledMessage.id)
+            .where(ScheduledMessage.group_pair_id == 100)
+            .order_by(ScheduledMessage.id)
+        )
+        ids = list(messages)
+        for msg_id, status in zip(
+            ids, (MessageStatusEnum.SENT, MessageStatusEnum.SENT, MessageStatusEnum.ERROR)
+        ):
+            msg = await session.get(ScheduledMessage, msg_id)
+            msg.status = status
+        # text edits don't touch the counters
+        await session.execute(
+            update(ScheduledMessage)
+            .where(ScheduledMessage.id == ids[4])
+            .values(text='edited')
+        )
+    assert await get_stats(db, 100) == (2, 2, 1)
+
+    async with db.session_factory.begin() as session:
+        await session.execute(
+            delete(ScheduledMessage).where(ScheduledMessage.id == ids[4])
+        )
+        stats = await session.get(PairStats, 100)
+        assert stats.last_sent_at is not None
+    assert await get_stats(db, 100) == (1, 2, 1)
+    assert await get_stats(db, 101) == (5, 0, 0)
+
+    # finished messages leaving the table stay counted
+    async with db.session_factory.begin() as session:
+        await session.execute(
+            update(ScheduledMessage)
+            .where(ScheduledMessage.status != MessageStatusEnum.NOT_SENT)
+            .values(finished_at=datetime.now(UTC) - timedelta(days=10))
+        )
+    await run_retention(db, timedelta(days=7), batch_size=10, archive=True)
+    assert await get_stats(db, 100) == (1, 2, 1)
+
+
+@pytest.mark.asyncio
+async def test_last_sent_times(db):
+    sent_at = datetime.now(UTC) - timedelta(minutes=5)
+    async with db.session_factory.begin() as session:
+        await session.execute(
+            insert(ScheduledMessage.__table__),
+            [
+                {
+                    'message_id': 1,
+                    'group_pair_id': 100,
+                    'meta_info': 'empty',
+                    'status': MessageStatusEnum.SENT,
+                    'finished_at': sent_at,
+                },
+            ],
+        )
+
+    async with db.session_factory() as session:
+        # an empty queue still keeps the pair's spacing
+        assert await get_last_sent_times(session) == {100: sent_at}
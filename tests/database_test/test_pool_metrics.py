@@ -0,0 +1,42 @@
+import asyncio
+
+import pytest
+from sqlalchemy import text
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+
+from database.database_connector import DatabaseConnector
+from resender_bot.metrics import metrics
+
+
+@pytest.mark.asyncio
+async def test_checkout_waits_and_timeouts_are_recorded(db):
+    url = db.engine.url.render_as_string(hide_password=False)
+    small_db = DatabaseConnector(url=url, pool_size=1, max_overflow=0, pool_timeout=1)
+    metrics.timings.pop('db_pool_wait_primary', None)
+    metrics.timings.pop('db_pool_connect_primary', None)
+    timeouts = metrics.counters['db_pool_timeouts_primary']
+
+    async def hold(seconds: float):
+        async with small_db.engine.connect() as conn:
+            await conn.execute(text('SELECT 1'))
+            await asyncio.sleep(seconds)
+
+    # the first checkout opens the connection, the second one waits for it
+    holder = asyncio.create_task(hold(0.3))
+    await asyncio.sleep(0.1)
+    await hold(0)
+    await holder
+
+    assert metrics.timings['db_pool_connect_primary'].count == 1
+    wait = metrics.timings['db_pool_wait_primary']
+    assert wait.count == 1
+    assert wait.max >= 0.1
+
+    holder = asyncio.create_task(hold(1.5))
+    await asyncio.sleep(0.1)
+    with pytest.raises(PoolTimeoutError):
+        await hold(0)
+    await holder
+    await small_db.dispose()
+
+    assert metrics.counters['db_pool_timeouts_primary'] == timeouts + 1
@@ -0,0 +1,95 @@
+import asyncio
+from datetime import UTC, datetime
+from types import SimpleNamespace
+
+import pytest
+from aiogram.types import Chat, Message
+from sqlalchemy import select
+
+from database.database_connector import GroupPair, MessageStatusEnum, ScheduledMessage
+from resender_bot.handlers.base_handlers import any_message
+from resender_bot.sender_task import SenderTaskManager
+from resender_bot.settings import Settings
+
+
+class FakeBot:
+    def __init__(self):
+        self.sent = []
+        self.deleted = []
+
+    async def send_message(self, chat_id, text, **kwargs):
+        self.sent.append((chat_id, text))
+        return SimpleNamespace(message_id=len(self.sent))
+
+    async def delete_message(self, chat_id, message_id):
+        self.deleted.append((chat_id, message_id))
+
+
+class WakeRecorder:
+    def __init__(self):
+        self.woken = []
+
+    def wake_pair(self, private_chat_id):
+        self.woken.append(private_chat_id)
+
+
+async def add_pair(db):
+    async with db.session_factory.begin() as session:
+        session.add(GroupPair(private_chat_id=100, public_chat_id=200, interval=0))
+
+
+@pytest.mark.asyncio
+async def test_enqueued_message_wakes_its_sender(db):
+    await add_pair(db)
+    task_manager = WakeRecorder()
+    settings = Settings.model_construct(DEDUP_WINDOW_HOURS=None, QUEUE_WAKEUPS=True)
+    message = Message(
+        message_id=5,
+        date=datetime.now(UTC),
+        chat=Chat(id=100, type='supergroup'),
+        text='hello',
+    )
+
+    async with (
+        db.session_factory() as db_session,
+        db.read_session_factory() as db_read_session,
+    ):
+        await any_message(
+            message, FakeBot(), db_session, db_read_session, settings, task_manager
+        )
+
+    assert task_manager.woken == [100]
+    # committed before the wakeup, so the sender sees the message
+    async with db.session_factory() as session:
+        queued = await session.scalar(select(ScheduledMessage))
+    assert queued.message_id == 5
+
+
+@pytest.mark.asyncio
+async def test_idle_sender_polls_when_no_wakeup_arrives(db):
+    await add_pair(db)
+    bot = FakeBot()
+    manager = SenderTaskManager(
+        db, bot, admin_id=1, queue_wakeups=True, idle_poll_interval=0.2
+    )
+    manager.add_task(100)
+    await asyncio.sleep(0.1)
+    assert 100 in manager.idle
+
+    # queued behind the sender's back: no NOTIFY, no wake_pair
+    async with db.session_factory.begin() as session:
+        session.add(
+            ScheduledMessage(
+                message_id=7, group_pair_id=100, text='late', meta_info='empty'
+            )
+        )
+    for _ in range(20):
+        if bot.sent:
+            break
+        await asyncio.sleep(0.05)
+
+    await manager.shutdown(timeout=1)
+    assert bot.sent == [(200, 'late')]
+    async with db.session_factory() as session:
+        msg = await session.scalar(select(ScheduledMessage))
+    assert msg.status == MessageStatusEnum.SENT
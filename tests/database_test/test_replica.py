@@ -0,0 +1,31 @@
+import pytest
+from sqlalchemy import select
+
+from database.database_connector import DatabaseConnector, GroupPair
+from middlewares.session_middleware import DBSessionMiddleware
+from resender_bot.metrics import metrics
+
+
+@pytest.mark.asyncio
+async def test_reads_go_to_the_replica_and_writes_to_the_primary(db):
+    url = db.engine.url.render_as_string(hide_password=False)
+    split_db = DatabaseConnector(url=url, replica_url=url)
+    checkouts = {
+        name: metrics.counters[f'db_pool_checkouts_{name}']
+        for name in ('primary', 'replica')
+    }
+
+    async def handler(update, data):
+        assert await data['db_read_session'].get(GroupPair, 100) is None
+        data['db_session'].add(
+            GroupPair(private_chat_id=100, public_chat_id=200, interval=0)
+        )
+
+    await DBSessionMiddleware(split_db)(handler, object(), {})
+    await split_db.dispose()
+
+    for name in ('primary', 'replica'):
+        assert metrics.counters[f'db_pool_checkouts_{name}'] == checkouts[name] + 1
+    assert metrics.timings['db_pool_hold_replica'].count > 0
+    async with db.session_factory() as session:
+        assert await session.scalar(select(GroupPair.public_chat_id)) == 200
@@ -0,0 +1,84 @@
+from datetime import UTC, datetime, timedelta
+
+import pytest
+from sqlalchemy import func, select, text
+
+from database.database_connector import (
+    ArchivedMessage,
+    MessageStatusEnum,
+    ScheduledMessage,
+)
+from database.migrations import apply_migrations
+from resender_bot.retention import run_retention
+
+
+async def add_messages(
+    db, status: MessageStatusEnum, finished_at: datetime | None, n: int
+):
+    async with db.session_factory.begin() as session:
+        for i in range(n):
+            msg = ScheduledMessage(message_id=i, group_pair_id=100, meta_info="empty")
+            msg.status = status
+            msg.finished_at = finished_at
+            session.add(msg)
+
+
+async def count(db, model) -> int:
+    async with db.session_factory() as session:
+        return await session.scalar(select(func.count()).select_from(model))
+
+
+@pytest.mark.asyncio
+async def test_finished_messages_are_archived_in_batches(db):
+    old = datetime.now(UTC) - timedelta(days=10)
+    await add_messages(db, MessageStatusEnum.SENT, old, 5)
+    await add_messages(db, MessageStatusEnum.ERROR, old, 2)
+    await add_messages(db, MessageStatusEnum.SENT, datetime.now(UTC), 3)
+    await add_messages(db, MessageStatusEnum.NOT_SENT, None, 4)
+
+    processed = await run_retention(db, timedelta(days=7), batch_size=2, archive=True)
+
+    assert processed == 7
+    assert await count(db, ScheduledMessage) == 7
+    assert await count(db, ArchivedMessage) == 7
+    async with db.session_factory() as session:
+        archived = await session.scalar(select(ArchivedMessage).limit(1))
+        assert archived.data['group_pair_id'] == 100
+
+
+@pytest.mark.asyncio
+async def test_finished_messages_are_deleted(db):
+    old = datetime.now(UTC) - timedelta(days=10)
+    await add_messages(db, MessageStatusEnum.SENT, old, 3)
+
+    processed = await run_retention(db, timedelta(days=7), batch_size=10, archive=False)
+
+    assert processed == 3
+    assert await count(db, ScheduledMessage) == 0
+    assert await count(db, ArchivedMessage) == 0
+
+
+def test_status_change_sets_finished_at():
+    msg = ScheduledMessage(message_id=1, group_pair_id=100, meta_info="empty")
+    assert msg.finished_at is None
+    msg.status = MessageStatusEnum.SENT
+    assert msg.finished_at is not None
+
+
+@pytest.mark.asyncio
+async def test_migration_backfills_finished_at_from_created_at(db):
+    old = datetime.now(UTC) - timedelta(days=10)
+    await add_messages(db, MessageStatusEnum.SENT, None, 1)
+    await add_messages(db, MessageStatusEnum.NOT_SENT, None, 1)
+    async with db.engine.begin() as conn:
+        await conn.execute(
+            text("UPDATE scheduled_messages SET created_at = :old"), {"old": old}
+        )
+        await conn.execute(text("ALTER TABLE scheduled_messages DROP COLUMN finished_at"))
+        await apply_migrations(conn)
+
+    async with db.session_factory() as session:
+        rows = (await session.scalars(select(ScheduledMessage))).all()
+    finished = {msg.status: msg.finished_at for msg in rows}
+    assert finished[MessageStatusEnum.SENT] == old
+    assert finished[MessageStatusEnum.NOT_SENT] is None
@@ -0,0 +1,44 @@
+from datetime import UTC, datetime, timedelta
+
+import pytest
+
+from database.database_connector import (
+    ScheduledMessage,
+    SendOrderEnum,
+    get_next_attempt_at,
+    get_next_msg,
+)
+
+
+@pytest.mark.asyncio
+async def test_messages_backing_off_are_skipped(db):
+    retry_at = datetime.now(UTC) + timedelta(minutes=5)
+    async with db.session_factory.begin() as session:
+        session.add(
+            ScheduledMessage(
+                message_id=1,
+                group_pair_id=100,
+                meta_info="empty",
+                attempts=1,
+                next_attempt_at=retry_at,
+            )
+        )
+
+    async with db.session_factory() as session:
+        assert await get_next_msg(session, 100, SendOrderEnum.OLDEST) is None
+        assert await get_next_attempt_at(session, 100) == retry_at
+
+    async with db.session_factory.begin() as session:
+        due = ScheduledMessage(
+            message_id=2,
+            group_pair_id=100,
+            meta_info="empty",
+            attempts=2,
+            next_attempt_at=datetime.now(UTC) - timedelta(seconds=1),
+        )
+        session.add(due)
+
+    async with db.session_factory() as session:
+        next_msg = await get_next_msg(session, 100, SendOrderEnum.OLDEST)
+        assert next_msg.id == due.id
+        assert next_msg.attempts == 2
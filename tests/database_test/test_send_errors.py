@@ -0,0 +1,134 @@
+from datetime import UTC, datetime
+
+import pytest
+from aiogram.exceptions import TelegramServerError
+from aiogram.methods import SendMessage
+from sqlalchemy import select
+
+from database.database_connector import (
+    GroupPair,
+    MessageStatusEnum,
+    ScheduledMessage,
+    get_next_attempt_at,
+)
+from resender_bot.retry import RetryPolicy
+from resender_bot.sender_task import SenderTaskManager
+
+METHOD = SendMessage(chat_id=1, text="a")
+
+
+class FakeBot:
+    def __init__(self):
+        self.sent = []
+        self.deleted = []
+
+    async def send_message(self, chat_id, text, **kwargs):
+        self.sent.append((chat_id, text))
+
+    async def delete_message(self, chat_id, message_id):
+        self.deleted.append((chat_id, message_id))
+
+
+async def failing_manager(
+    db, exc: Exception, attempts: int
+) -> tuple[SenderTaskManager, FakeBot]:
+    async with db.session_factory.begin() as session:
+        session.add(GroupPair(private_chat_id=100, public_chat_id=200, interval=0))
+        session.add(
+            ScheduledMessage(
+                message_id=5, group_pair_id=100, meta_info="empty", attempts=attempts
+            )
+        )
+
+    bot = FakeBot()
+    manager = SenderTaskManager(
+        db, bot, admin_id=1, retry_policy=RetryPolicy(max_attempts=5)
+    )
+
+    async def compose_and_send_msg(*args):
+        raise exc
+
+    manager._compose_and_send_msg = compose_and_send_msg
+    return manager, bot
+
+
+async def stored_message(db) -> ScheduledMessage:
+    async with db.session_factory() as session:
+        return await session.scalar(select(ScheduledMessage))
+
+
+@pytest.mark.asyncio
+async def test_transient_error_schedules_another_attempt(db):
+    manager, bot = await failing_manager(
+        db, TelegramServerError(METHOD, "Bad Gateway"), 0
+    )
+
+    await manager._process_single_msg(100)
+
+    msg = await stored_message(db)
+    assert msg.status == MessageStatusEnum.NOT_SENT
+    assert msg.attempts == 1
+    assert msg.next_attempt_at > datetime.now(UTC)
+    assert "Bad Gateway" in msg.last_error
+    # the source is kept for the next attempt, the admin isn't bothered yet
+    assert bot.deleted == []
+    assert bot.sent == []
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    "exc, attempts",
+    [
+        (RuntimeError("Unexpected mime type"), 0),
+        (TelegramServerError(METHOD, "Bad Gateway"), 4),
+    ],
+    ids=["terminal", "out_of_attempts"],
+)
+async def test_failed_message_is_reported_once(db, exc, attempts):
+    manager, bot = await failing_manager(db, exc, attempts)
+
+    await manager._process_single_msg(100)
+
+    msg = await stored_message(db)
+    assert msg.status == MessageStatusEnum.ERROR
+    assert msg.attempts == attempts + 1
+    assert bot.deleted == [(100, 5)]
+    assert len(bot.sent) == 1
+    assert bot.sent[0][0] == 1
+
+
+@pytest.mark.asyncio
+async def test_idle_sender_asks_for_retries_only_when_one_is_due(db, monkeypatch):
+    queries = []
+
+    async def counting_get_next_attempt_at(session, group_pair_id):
+        queries.append(group_pair_id)
+        return await get_next_attempt_at(session, group_pair_id)
+
+    monkeypatch.setattr(
+        "resender_bot.sender_task.get_next_attempt_at", counting_get_next_attempt_at
+    )
+    manager, bot = await failing_manager(
+        db, TelegramServerError(METHOD, "Bad Gateway"), 0
+    )
+    # a fresh sender doesn't know about retries scheduled before it started
+    manager.add_task(100, start_delay=100)
+    manager.tasks.pop(100).cancel()
+    assert await manager._retry_in(100) is None
+    assert queries == [100]
+    assert await manager._retry_in(100) is None
+    assert queries == [100]
+
+    await manager._process_single_msg(100)
+
+    msg = await stored_message(db)
+    retry_in = await manager._retry_in(100)
+    assert queries == [100]
+    assert retry_in == pytest.approx(
+        (msg.next_attempt_at - datetime.now(UTC)).total_seconds(), abs=1
+    )
+
+    # due, the next one is looked up
+    manager.retry_at[100] = datetime.now(UTC)
+    assert await manager._retry_in(100) == pytest.approx(retry_in, abs=1)
+    assert queries == [100, 100]
@@ -0,0 +1,41 @@
+import pytest
+from sqlalchemy import event, select
+
+from database.database_connector import GroupPair
+from middlewares.session_middleware import DBSessionMiddleware
+
+
+def count_checkouts(db) -> list:
+    checkouts = []
+    for engine in (db.engine, db.read_engine):
+        event.listen(
+            engine.sync_engine.pool, 'checkout', lambda *args: checkouts.append(1)
+        )
+    return checkouts
+
+
+@pytest.mark.asyncio
+async def test_handler_without_db_opens_no_connection(db):
+    checkouts = count_checkouts(db)
+
+    async def handler(update, data):
+        return 'handled'
+
+    res = await DBSessionMiddleware(db)(handler, object(), {})
+
+    assert res == 'handled'
+    assert checkouts == []
+
+
+@pytest.mark.asyncio
+async def test_added_objects_are_committed(db):
+    async def handler(update, data):
+        data['db_session'].add(
+            GroupPair(private_chat_id=100, public_chat_id=200, interval=0)
+        )
+
+    await DBSessionMiddleware(db)(handler, object(), {})
+
+    async with db.session_factory() as session:
+        pair = await session.scalar(select(GroupPair))
+    assert pair.public_chat_id == 200
@@ -0,0 +1,89 @@
+import asyncio
+import logging
+from types import SimpleNamespace
+
+import pytest
+from sqlalchemy import select
+
+from database.database_connector import GroupPair, MessageStatusEnum, ScheduledMessage
+from database.notify_listener import NotifyListener
+from resender_bot.edit_debouncer import EditDebouncer
+from resender_bot.sender_task import SenderTaskManager
+from resender_bot.settings import Settings
+from resender_bot.shutdown import on_shutdown_drain
+
+
+class SlowBot:
+    """Publishing takes `send_time` seconds"""
+
+    def __init__(self, send_time: float):
+        self.send_time = send_time
+        self.sending = asyncio.Event()
+        self.cancelled = False
+        self.deleted = []
+
+    async def send_message(self, chat_id, text, **kwargs):
+        self.sending.set()
+        try:
+            await asyncio.sleep(self.send_time)
+        except asyncio.CancelledError:
+            self.cancelled = True
+            raise
+        return SimpleNamespace(message_id=1)
+
+    async def delete_message(self, chat_id, message_id):
+        self.deleted.append((chat_id, message_id))
+
+
+async def start_sending(db, bot: SlowBot) -> SenderTaskManager:
+    async with db.session_factory.begin() as session:
+        session.add(GroupPair(private_chat_id=100, public_chat_id=200, interval=0))
+        session.add(
+            ScheduledMessage(
+                message_id=5, group_pair_id=100, meta_info="empty", text="hello"
+            )
+        )
+
+    manager = SenderTaskManager(db, bot, admin_id=1)
+    manager.add_task(100)
+    await asyncio.wait_for(bot.sending.wait(), timeout=5)
+    return manager
+
+
+async def stored_status(db) -> MessageStatusEnum:
+    async with db.session_factory() as session:
+        return await session.scalar(select(ScheduledMessage.status))
+
+
+@pytest.mark.asyncio
+async def test_in_flight_send_is_committed_before_the_engines_are_disposed(db):
+    bot = SlowBot(send_time=0.2)
+    manager = await start_sending(db, bot)
+
+    await on_shutdown_drain(
+        task_manager=manager,
+        edit_debouncer=EditDebouncer(db, delay=1),
+        background_tasks=[],
+        notify_listener=NotifyListener(db.raw_dsn),
+        db=db,
+        settings=Settings.model_construct(SHUTDOWN_TIMEOUT_SECONDS=5),
+    )
+
+    assert not bot.cancelled
+    assert bot.deleted == [(100, 5)]
+    assert all(task.done() for task in manager.tasks.values())
+    assert await stored_status(db) == MessageStatusEnum.SENT
+
+
+@pytest.mark.asyncio
+async def test_send_past_the_timeout_is_cancelled(db, caplog):
+    bot = SlowBot(send_time=60)
+    manager = await start_sending(db, bot)
+
+    with caplog.at_level(logging.WARNING):
+        await manager.shutdown(timeout=0.1)
+
+    assert bot.cancelled
+    assert "1 senders didn't finish in time, cancelling" in caplog.text
+    # rolled back, sent again after restart
+    assert await stored_status(db) == MessageStatusEnum.NOT_SENT
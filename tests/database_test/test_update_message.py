@@ -0,0 +1,61 @@
+import pytest
+
+from database.database_connector import (
+    MessageStatusEnum,
+    ScheduledMessage,
+    update_scheduled_message,
+)
+from resender_bot.edit_debouncer import EditDebouncer, PendingEdit
+
+
+async def add_message(db, message_id: int, status: MessageStatusEnum) -> int:
+    async with db.session_factory.begin() as session:
+        msg = ScheduledMessage(
+            message_id=message_id,
+            group_pair_id=100,
+            status=status,
+            text="old",
+            meta_info="empty",
+        )
+        session.add(msg)
+    return msg.id
+
+
+@pytest.mark.asyncio
+async def test_update_scheduled_message(db):
+    queued_id = await add_message(db, 1, MessageStatusEnum.NOT_SENT)
+    await add_message(db, 2, MessageStatusEnum.SENT)
+
+    async with db.session_factory.begin() as session:
+        assert (
+            await update_scheduled_message(session, 100, 1, "new", None, None, None)
+            == queued_id
+        )
+        assert (
+            await update_scheduled_message(session, 100, 2, "new", None, None, None)
+            is None
+        )
+        assert (
+            await update_scheduled_message(session, 100, 3, "new", None, None, None)
+            is None
+        )
+
+    async with db.session_factory.begin() as session:
+        assert (await session.get(ScheduledMessage, queued_id)).text == "new"
+
+
+@pytest.mark.asyncio
+async def test_debouncer_writes_last_edit(db):
+    msg_id = await add_message(db, 1, MessageStatusEnum.NOT_SENT)
+
+    debouncer = EditDebouncer(db, delay=60)
+    for text in ("first", "second", "last"):
+        debouncer.push(
+            100, 1, PendingEdit(text=text, links=None, file_id=None, media_type=None)
+        )
+    assert len(debouncer.pending) == 1
+
+    await debouncer.flush_all()
+
+    async with db.session_factory.begin() as session:
+        assert (await session.get(ScheduledMessage, msg_id)).text == "last"
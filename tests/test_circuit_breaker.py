@@ -0,0 +1,56 @@
+import time
+
+from aiogram.exceptions import (
+    TelegramBadRequest,
+    TelegramForbiddenError,
+    TelegramServerError,
+)
+from aiogram.methods import SendMessage
+
+from resender_bot.circuit_breaker import CircuitBreaker, is_channel_error
+
+METHOD = SendMessage(chat_id=1, text="a")
+
+
+def forbidden() -> TelegramForbiddenError:
+    return TelegramForbiddenError(METHOD, "bot is not a member of the channel chat")
+
+
+def test_channel_errors_are_recognized():
+    assert is_channel_error(forbidden())
+    assert is_channel_error(TelegramBadRequest(METHOD, "Bad Request: chat not found"))
+    assert not is_channel_error(
+        TelegramBadRequest(METHOD, "Bad Request: wrong file identifier")
+    )
+    assert not is_channel_error(TelegramServerError(METHOD, "Bad Gateway"))
+
+
+def test_breaker_opens_after_consecutive_failures_of_the_same_class():
+    breaker = CircuitBreaker(threshold=3, probe_interval=60)
+
+    assert not breaker.record_failure(forbidden())
+    assert not breaker.record_failure(forbidden())
+    # another kind of failure starts counting again
+    assert not breaker.record_failure(TelegramBadRequest(METHOD, "chat not found"))
+    assert not breaker.record_failure(forbidden())
+    assert not breaker.record_failure(forbidden())
+    assert breaker.record_failure(forbidden())
+    assert breaker.is_open
+    # opened only once
+    assert not breaker.record_failure(forbidden())
+    assert 59 < breaker.probe_in() <= 60
+
+
+def test_breaker_closes_on_success():
+    breaker = CircuitBreaker(threshold=1, probe_interval=60)
+    assert not breaker.record_success()
+
+    breaker.record_failure(forbidden())
+    breaker.next_probe_at = time.monotonic() - 1
+    assert breaker.probe_in() == 0
+    breaker.probe_failed()
+    assert breaker.probe_in() > 59
+
+    assert breaker.record_success()
+    assert not breaker.is_open
+    assert str(breaker) == "ok"
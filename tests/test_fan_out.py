@@ -0,0 +1,121 @@
+import time
+
+import pytest
+from aiogram.exceptions import (
+    TelegramBadRequest,
+    TelegramForbiddenError,
+    TelegramNetworkError,
+)
+from aiogram.methods import CopyMessages
+
+from database.database_connector import SendOrderEnum
+from resender_bot.rate_limiter import RateLimiter
+from resender_bot.retry import RetryPolicy
+from resender_bot.sender_task import PairSettings, SenderTaskManager
+
+
+class FakeBot:
+    """Copies to a chat from `failing` fail with its errors in turn, the last one
+    repeats. An error is a bad request message or an exception class, None succeeds
+    """
+
+    def __init__(self, failing: dict[int, list[str | type | None]] | None = None):
+        self.failing = failing or {}
+        self.copies = []
+        self.sent = []
+
+    async def copy_messages(self, chat_id, from_chat_id, message_ids):
+        self.copies.append((chat_id, from_chat_id, message_ids))
+        errors = self.failing.get(chat_id)
+        if not errors:
+            return
+        error = errors.pop(0) if len(errors) > 1 else errors[0]
+        method = CopyMessages(
+            chat_id=chat_id, from_chat_id=from_chat_id, message_ids=message_ids
+        )
+        if isinstance(error, str):
+            raise TelegramBadRequest(method, error)
+        if error is not None:
+            raise error(method, "try again")
+
+    async def send_message(self, chat_id, text):
+        self.sent.append((chat_id, text))
+
+
+def make_pair(*extra_chat_ids: int) -> PairSettings:
+    return PairSettings(
+        private_chat_id=10,
+        public_chat_id=-1,
+        send_order=SendOrderEnum.OLDEST,
+        interval=60,
+        extra_chat_ids=list(extra_chat_ids),
+    )
+
+
+@pytest.mark.asyncio
+async def test_post_is_copied_to_extra_channels():
+    bot = FakeBot(failing={-3: ["chat not found"]})
+    manager = SenderTaskManager(None, bot, admin_id=1)
+
+    await manager._fan_out(make_pair(-2, -3, -4), [5, 6, 7])
+
+    # an album is copied in one call, from the main channel
+    assert sorted(bot.copies) == [
+        (-4, -1, [5, 6, 7]),
+        (-3, -1, [5, 6, 7]),
+        (-2, -1, [5, 6, 7]),
+    ]
+    # the failed channel goes to its breaker, others are not affected
+    assert manager.breakers[-3].failures == 1
+    assert bot.sent == []
+
+
+@pytest.mark.asyncio
+async def test_kicked_target_is_suspended_with_a_single_report():
+    bot = FakeBot(failing={-3: [TelegramForbiddenError]})
+    manager = SenderTaskManager(None, bot, admin_id=1, breaker_threshold=3)
+
+    for post in range(10):
+        await manager._fan_out(make_pair(-2, -3), [post])
+
+    # copies to the kicked channel stop once it's suspended
+    assert len([copy for copy in bot.copies if copy[0] == -3]) == 3
+    assert manager.breakers[-3].is_open
+    assert len(bot.sent) == 1
+
+
+@pytest.mark.asyncio
+async def test_transient_copy_failures_are_retried():
+    bot = FakeBot(failing={-2: [TelegramNetworkError, TelegramNetworkError, None]})
+    manager = SenderTaskManager(
+        None, bot, admin_id=1, retry_policy=RetryPolicy(base_delay=0.01)
+    )
+
+    await manager._fan_out(make_pair(-2), [5])
+
+    assert len(bot.copies) == 3
+    assert bot.sent == []
+
+
+@pytest.mark.asyncio
+async def test_terminal_copy_failure_is_reported_escaped():
+    bot = FakeBot(failing={-2: ["Bad Request: can't parse <b>"]})
+    manager = SenderTaskManager(None, bot, admin_id=1)
+
+    await manager._fan_out(make_pair(-2), [5])
+
+    assert len(bot.sent) == 1
+    assert "&lt;b&gt;" in bot.sent[0][1]
+
+
+@pytest.mark.asyncio
+async def test_rate_limiter_spaces_calls_after_burst():
+    limiter = RateLimiter(rate=50, burst=5)
+
+    start = time.monotonic()
+    for _ in range(10):
+        await limiter.acquire()
+    elapsed = time.monotonic() - start
+
+    # 5 calls in the burst, the other 5 at 50 per second
+    assert 0.09 <= elapsed < 0.3
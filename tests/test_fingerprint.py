@@ -0,0 +1,19 @@
+from resender_bot.fingerprint import content_fingerprint
+
+
+def test_fingerprint_ignores_whitespace_and_case():
+    assert content_fingerprint("Hello  World\n", [], []) == content_fingerprint(
+        "hello world", [], []
+    )
+
+
+def test_fingerprint_depends_on_files_and_links():
+    base = content_fingerprint("text", ["file"], ["https://a.com"])
+    assert base != content_fingerprint("text", ["other"], ["https://a.com"])
+    assert base != content_fingerprint("text", ["file"], ["https://b.com"])
+    assert base != content_fingerprint("text", [], ["https://a.com"])
+
+
+def test_empty_message_has_no_fingerprint():
+    assert content_fingerprint(None, [], []) is None
+    assert content_fingerprint("  ", [], []) is None
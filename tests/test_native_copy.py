@@ -0,0 +1,86 @@
+import pytest
+from aiogram.exceptions import TelegramBadRequest
+from aiogram.methods import CopyMessages
+from aiogram.types import MessageId
+
+from database.database_connector import (
+    MessageLink,
+    MessageStatusEnum,
+    ScheduledMessage,
+    SendOrderEnum,
+)
+from resender_bot.sender_task import PairSettings, SenderTaskManager
+
+PAIR = PairSettings(
+    private_chat_id=10, public_chat_id=-1, send_order=SendOrderEnum.OLDEST, interval=60
+)
+
+
+class FakeBot:
+    def __init__(self):
+        self.copies = []
+        self.deleted = []
+
+    async def copy_messages(self, chat_id, from_chat_id, message_ids):
+        self.copies.append((chat_id, from_chat_id, message_ids))
+        return [MessageId(message_id=100 + i) for i in range(len(message_ids))]
+
+    async def delete_message(self, chat_id, message_id):
+        self.deleted.append((chat_id, message_id))
+
+
+def make_msg(message_id: int | None, **kwargs) -> ScheduledMessage:
+    return ScheduledMessage(
+        id=message_id,
+        message_id=message_id,
+        group_pair_id=10,
+        meta_info="empty",
+        **kwargs,
+    )
+
+
+@pytest.mark.asyncio
+async def test_album_is_copied_in_one_call():
+    bot = FakeBot()
+    manager = SenderTaskManager(None, bot, admin_id=1, copy_native_posts=True)
+    album = [make_msg(i, file_id=f"file{i}", media_type="PHOTO") for i in (3, 1, 2)]
+
+    sent_ids = await manager.copy_native_post(album[1], album, PAIR)
+
+    assert sent_ids == [100, 101, 102]
+    assert bot.copies == [(-1, 10, [1, 2, 3])]
+    assert all(msg.status == MessageStatusEnum.SENT for msg in album)
+    # the next message source is deleted by the caller
+    assert sorted(bot.deleted) == [(10, 2), (10, 3)]
+
+
+@pytest.mark.asyncio
+async def test_posts_with_links_or_without_source_are_composed():
+    bot = FakeBot()
+    manager = SenderTaskManager(None, bot, admin_id=1, copy_native_posts=True)
+    with_links = make_msg(1, text="a", links=[MessageLink(url="https://a.b/c.png")])
+    imported = make_msg(None, text="a")
+
+    assert await manager.copy_native_post(with_links, [with_links], PAIR) == []
+    assert await manager.copy_native_post(imported, [imported], PAIR) == []
+    assert bot.copies == []
+
+
+@pytest.mark.asyncio
+async def test_uncopyable_post_is_composed():
+    class ProtectedBot(FakeBot):
+        async def copy_messages(self, chat_id, from_chat_id, message_ids):
+            raise TelegramBadRequest(
+                CopyMessages(
+                    chat_id=chat_id, from_chat_id=from_chat_id, message_ids=message_ids
+                ),
+                "Bad Request: message has protected content and can't be copied",
+            )
+
+    bot = ProtectedBot()
+    manager = SenderTaskManager(None, bot, admin_id=1, copy_native_posts=True)
+    msg = make_msg(1, file_id="file1", media_type="PHOTO")
+
+    assert await manager.copy_native_post(msg, [msg], PAIR) == []
+    assert msg.status != MessageStatusEnum.SENT
+    assert bot.deleted == []
@@ -0,0 +1,27 @@
+import asyncio
+
+import asyncpg
+import pytest
+
+from database import notify_listener
+from database.notify_listener import NotifyListener
+
+
+@pytest.mark.asyncio
+async def test_listener_survives_interface_errors(monkeypatch):
+    attempts = []
+
+    async def connect(dsn):
+        attempts.append(dsn)
+        raise asyncpg.InterfaceError("connection is closed")
+
+    monkeypatch.setattr(asyncpg, 'connect', connect)
+    monkeypatch.setattr(notify_listener, 'RECONNECT_DELAY_SECONDS', 0.01)
+    listener = NotifyListener('postgresql://localhost/test')
+    listener.start()
+
+    await asyncio.sleep(0.2)
+
+    assert not listener.task.done()
+    assert len(attempts) >= 3
+    await listener.stop()
@@ -0,0 +1,88 @@
+import asyncio
+
+import pytest
+
+from database.database_connector import GroupPair, SendOrderEnum
+from resender_bot.sender_task import SenderTaskManager
+
+
+class PairsDb:
+    """Serves pairs from a dict, loads can be held to simulate a slow query"""
+
+    def __init__(self):
+        self.rows = {
+            10: GroupPair(
+                private_chat_id=10,
+                public_chat_id=-1,
+                interval=60,
+                send_order=SendOrderEnum.OLDEST,
+                extra_chat_ids=[],
+            )
+        }
+        self.loads = 0
+        self.release = asyncio.Event()
+        self.release.set()
+
+    def session_factory(self):
+        return self
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        return None
+
+    async def get(self, model, pk):
+        self.loads += 1
+        row = self.rows[pk]
+        # the row is read before the query "returns"
+        snapshot = GroupPair(
+            private_chat_id=row.private_chat_id,
+            public_chat_id=row.public_chat_id,
+            interval=row.interval,
+            send_order=row.send_order,
+            extra_chat_ids=row.extra_chat_ids,
+        )
+        await self.release.wait()
+        return snapshot
+
+
+@pytest.mark.asyncio
+async def test_pair_is_loaded_once():
+    db = PairsDb()
+    manager = SenderTaskManager(db, bot=None, admin_id=1)
+
+    assert (await manager._get_pair(10)).interval == 60
+    assert (await manager._get_pair(10)).interval == 60
+    assert db.loads == 1
+
+
+@pytest.mark.asyncio
+async def test_settings_change_is_picked_up_after_invalidation():
+    db = PairsDb()
+    manager = SenderTaskManager(db, bot=None, admin_id=1)
+    await manager._get_pair(10)
+
+    db.rows[10].send_order = SendOrderEnum.RANDOM
+    manager.invalidate_pair('10')
+
+    assert (await manager._get_pair(10)).send_order == SendOrderEnum.RANDOM
+    assert db.loads == 2
+
+
+@pytest.mark.asyncio
+async def test_load_racing_with_invalidation_is_not_cached():
+    db = PairsDb()
+    manager = SenderTaskManager(db, bot=None, admin_id=1)
+    db.release.clear()
+    loading = asyncio.create_task(manager._get_pair(10))
+    await asyncio.sleep(0)
+
+    # the settings change lands while the old row is in flight
+    db.rows[10].interval = 5
+    manager.invalidate_pair(10)
+    db.release.set()
+
+    assert (await loading).interval == 60
+    assert 10 not in manager.pairs
+    assert (await manager._get_pair(10)).interval == 5
@@ -0,0 +1,67 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from resender_bot import profiler
+from resender_bot.handlers.admin_handlers import profile_handler
+
+
+async def busy_sender():
+    while True:
+        sum(range(20000))
+        await asyncio.sleep(0)
+
+
+@pytest.mark.asyncio
+async def test_profile_report():
+    task = asyncio.create_task(busy_sender(), name='busy')
+    try:
+        report = await profiler.profile(0.3)
+    finally:
+        task.cancel()
+
+    assert "Event loop lag: samples:" in report
+    assert "Hot functions by own time" in report
+    assert "busy_sender" in report
+    assert not profiler.is_running()
+
+
+@pytest.mark.asyncio
+async def test_only_one_session_at_a_time():
+    session = asyncio.create_task(profiler.profile(0.2))
+    await asyncio.sleep(0.05)
+
+    assert profiler.is_running()
+    with pytest.raises(RuntimeError):
+        await profiler.profile(0.1)
+    await session
+
+
+class FakeMessage:
+    def __init__(self):
+        self.answers = []
+        self.documents = []
+
+    async def answer(self, text):
+        await asyncio.sleep(0)
+        self.answers.append(text)
+
+    async def answer_document(self, document, caption):
+        self.documents.append(document)
+
+
+@pytest.mark.asyncio
+async def test_concurrent_profile_command_is_refused():
+    first, second = FakeMessage(), FakeMessage()
+    command = SimpleNamespace(args='0.1')
+
+    await asyncio.gather(
+        profile_handler(first, command), profile_handler(second, command)
+    )
+
+    assert first.answers == ["Profiling for 0.1s..."]
+    assert len(first.documents) == 1
+    assert second.answers == ["Profiling is already running"]
+    assert second.documents == []
+    assert not profiler.is_running()
@@ -0,0 +1,31 @@
+import aiohttp
+from aiogram.exceptions import TelegramBadRequest, TelegramRetryAfter
+from aiogram.methods import SendMessage
+
+from resender_bot.retry import RetryPolicy, is_transient
+
+METHOD = SendMessage(chat_id=1, text="a")
+
+
+def test_errors_are_classified():
+    assert is_transient(TelegramRetryAfter(METHOD, "flood", retry_after=5))
+    assert is_transient(aiohttp.ClientConnectionError())
+    assert is_transient(TimeoutError())
+    assert not is_transient(TelegramBadRequest(METHOD, "chat not found"))
+    assert not is_transient(RuntimeError("Unexpected mime type"))
+
+
+def test_backoff_grows_with_jitter_up_to_the_cap():
+    policy = RetryPolicy(base_delay=10, max_delay=100)
+
+    for attempt, ceiling in ((1, 10), (2, 20), (3, 40), (4, 80), (5, 100), (9, 100)):
+        delays = [policy.delay(attempt) for _ in range(50)]
+        assert all(ceiling / 2 <= delay <= ceiling for delay in delays)
+        assert len(set(delays)) > 1
+
+
+def test_backoff_respects_retry_after():
+    policy = RetryPolicy(base_delay=1, max_delay=10)
+    exc = TelegramRetryAfter(METHOD, "flood", retry_after=300)
+
+    assert policy.delay(1, exc) == 300
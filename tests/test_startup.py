@@ -0,0 +1,49 @@
+from datetime import UTC, datetime, timedelta
+
+import pytest
+from pydantic import ValidationError
+
+from database.database_connector import GroupPair
+from resender_bot.sender_task import plan_start_delays
+from resender_bot.settings import Settings
+
+
+def make_pairs(n: int, interval: int = 180) -> list[GroupPair]:
+    return [
+        GroupPair(private_chat_id=i, public_chat_id=-i, interval=interval)
+        for i in range(n)
+    ]
+
+
+def test_pairs_resume_after_their_interval():
+    now = datetime.now(UTC)
+    pairs = make_pairs(2)
+    last_sent = {0: now - timedelta(seconds=60), 1: now - timedelta(seconds=600)}
+
+    delays = plan_start_delays(pairs, last_sent, now, rate=100, jitter=0)
+
+    assert delays[0] == 120
+    assert delays[1] == 0
+
+
+def test_pairs_come_online_at_limited_rate():
+    now = datetime.now(UTC)
+    delays = plan_start_delays(make_pairs(50), {}, now, rate=10, jitter=0)
+
+    starts = sorted(delays.values())
+    assert starts[0] == 0
+    assert all(b - a >= 0.1 - 1e-9 for a, b in zip(starts, starts[1:]))
+    assert starts[-1] < 5
+
+
+def test_jitter_is_bounded():
+    now = datetime.now(UTC)
+    delays = plan_start_delays(make_pairs(20), {}, now, rate=1000, jitter=3)
+
+    assert all(0 <= delay < 3 + 20 / 1000 for delay in delays.values())
+
+
+@pytest.mark.parametrize('name', ['STARTUP_PAIRS_PER_SECOND', 'FAN_OUT_RATE'])
+def test_rates_must_be_positive(name):
+    with pytest.raises(ValidationError):
+        Settings(BOT_TOKEN='token', ADMIN_ID=1, DB_URL='postgresql://', **{name: 0})
@@ -0,0 +1,118 @@
+import asyncio
+from datetime import UTC, datetime, timedelta
+
+import pytest
+
+from resender_bot.sender_task import SenderTaskManager
+
+
+class FakeBot:
+    def __init__(self):
+        self.sent = []
+
+    async def send_message(self, chat_id, text):
+        self.sent.append((chat_id, text))
+
+
+class NoPairsSession:
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        return None
+
+    async def get(self, model, pk):
+        return None
+
+
+class NoPairsDb:
+    def session_factory(self):
+        return NoPairsSession()
+
+
+async def crash():
+    raise RuntimeError("boom")
+
+
+async def stop(manager: SenderTaskManager):
+    manager.stopping = True
+    for task in manager.tasks.values():
+        task.cancel()
+    await asyncio.gather(*manager.tasks.values(), return_exceptions=True)
+
+
+@pytest.mark.asyncio
+async def test_dead_and_stalled_senders_are_restarted():
+    bot = FakeBot()
+    manager = SenderTaskManager(NoPairsDb(), bot, admin_id=1)
+    manager.add_task(10, start_delay=100)
+    manager.add_task(20, start_delay=100)
+    manager.tasks[10].cancel()
+    manager.tasks[10] = asyncio.create_task(crash())
+    stalled = manager.tasks[20]
+    manager.health[20].busy_since = datetime.now(UTC) - timedelta(minutes=20)
+    await asyncio.sleep(0)
+
+    await manager.check_senders(stall_timeout=600)
+
+    assert stalled.cancelled()
+    for private_chat_id in (10, 20):
+        assert not manager.tasks[private_chat_id].done()
+        assert manager.health[private_chat_id].restarts == 1
+    assert len(bot.sent) == 2
+
+    # healthy senders are left alone
+    await manager.check_senders(stall_timeout=600)
+    assert manager.health[10].restarts == 1
+    await stop(manager)
+
+
+@pytest.mark.asyncio
+async def test_deregistered_pair_is_retired():
+    bot = FakeBot()
+    manager = SenderTaskManager(NoPairsDb(), bot, admin_id=1)
+    manager.add_task(10)
+    task = manager.tasks[10]
+
+    await asyncio.wait_for(task, timeout=1)
+
+    assert 10 not in manager.tasks
+    assert manager.health_snapshot() == {}
+    assert bot.sent == []
+
+
+@pytest.mark.asyncio
+async def test_stalled_sender_is_restarted_only_after_it_stops(monkeypatch):
+    monkeypatch.setattr("resender_bot.sender_task.STALL_CANCEL_TIMEOUT_SECONDS", 0.05)
+    bot = FakeBot()
+    manager = SenderTaskManager(NoPairsDb(), bot, admin_id=1)
+    release = asyncio.Event()
+
+    async def stubborn():
+        while not release.is_set():
+            try:
+                await release.wait()
+            except asyncio.CancelledError:
+                pass
+
+    manager.add_task(10, start_delay=100)
+    manager.tasks[10].cancel()
+    stalled = manager.tasks[10] = asyncio.create_task(stubborn())
+    manager.health[10].busy_since = datetime.now(UTC) - timedelta(minutes=20)
+    await asyncio.sleep(0)
+
+    await manager.check_senders(stall_timeout=600)
+
+    assert manager.tasks[10] is stalled
+    assert manager.health[10].restarts == 0
+    assert manager.health[10].busy_since is not None
+    assert bot.sent == []
+
+    release.set()
+    await manager.check_senders(stall_timeout=600)
+
+    assert manager.tasks[10] is not stalled
+    assert not manager.tasks[10].done()
+    assert manager.health[10].restarts == 1
+    assert len(bot.sent) == 1
+    await stop(manager)